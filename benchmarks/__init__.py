@@ -0,0 +1 @@
+"""Offline performance benchmarks; see startup.py and pipeline.py."""
@@ -0,0 +1,86 @@
+"""Deterministic offline stand-ins for the embedding API and the LLM."""
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors seeded from the text's tokens, so texts sharing words land near each other.
+
+    `latency` seconds are spent per call, like a remote embedding API round trip.
+    """
+
+    def __init__(self, dimensions: int = 384, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9-]+", text.lower()):
+            seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector += np.random.default_rng(seed).standard_normal(self.dimensions, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeLLM(LLM):
+    """Answers with a fixed sentence after `latency` seconds, then streams it at `token_delay` per token."""
+
+    latency: float = 0.5
+    token_delay: float = 0.01
+    answer_tokens: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _tokens(self, prompt: str) -> List[str]:
+        question = prompt.rsplit("Question:", 1)[-1].split("Answer:", 1)[0].strip()
+        words = (f"According to the website, {question}".split() * self.answer_tokens)[:self.answer_tokens]
+        return [word + " " for word in words]
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        tokens = self._tokens(prompt)
+        time.sleep(self.latency + self.token_delay * len(tokens))
+        return "".join(tokens)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        tokens = self._tokens(prompt)
+        await asyncio.sleep(self.latency + self.token_delay * len(tokens))
+        return "".join(tokens)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(prompt):
+            time.sleep(self.token_delay)
+            yield GenerationChunk(text=token)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(prompt):
+            await asyncio.sleep(self.token_delay)
+            yield GenerationChunk(text=token)
@@ -0,0 +1,290 @@
+"""Ingestion and QA benchmark, fully offline.
+
+Serves a synthetic site locally, times each ingestion stage on its own (Crawler, Extractor,
+Cleaner, Chunker, VectorStore) and the streamed Indexer end to end, then measures `api_chat`
+latency through Django's ASGI handler. Embeddings and the LLM are deterministic fakes with
+configurable latency, so results track this code rather than remote services:
+
+    python -m benchmarks.pipeline --pages 100 --questions 200 --output bench.json
+    python -m benchmarks.pipeline --baseline bench.json      # exit 1 on regressions
+
+Everything runs in a temporary directory (database, indexes, caches).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.site import SyntheticSite, serve  # noqa: E402
+
+
+def _configure_environment(workdir: str, vector_store: str):
+    # Config and settings read the environment at import time, so this must run before Django starts.
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "web_chat_project.settings")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'db.sqlite3')}"
+    os.environ["VECTOR_STORE_PROVIDER"] = vector_store
+    # Repeated questions must reach retrieval and the LLM, not the answer cache.
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    # Relative paths (vector indexes, BM25, embedding and fetch caches) resolve inside the work directory.
+    os.chdir(workdir)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    # Nearest-rank percentile.
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def _stage(seconds: float, items: int, **extra) -> Dict:
+    return {"seconds": round(seconds, 4), "items": items,
+            "ms_per_item": round(seconds * 1000 / items, 3) if items else None, **extra}
+
+
+def bench_stages(url: str, pages: int, embedding_function) -> Dict:
+    """Each stage timed in isolation over the previous stage's full output."""
+    from chat.backend.crawler import Crawler
+    from chat.backend.extractor import Extractor
+    from chat.backend.cleaner import Cleaner
+    from chat.backend.chunker import Chunker
+    from chat.backend.vectorstore import VectorStore
+
+    stages = {}
+    start = time.perf_counter()
+    crawled = Crawler(use_sitemaps=False).crawl(url, limit=pages)
+    stages["crawl"] = _stage(time.perf_counter() - start, len(crawled))
+
+    extractor = Extractor()
+    start = time.perf_counter()
+    extracted = [(page["url"], extractor.extract(page["html"], document=page["document"])) for page in crawled]
+    stages["extract"] = _stage(time.perf_counter() - start, len(extracted))
+
+    cleaner = Cleaner()
+    start = time.perf_counter()
+    cleaned = [(url, result["title"], cleaner.clean(result["text"])) for url, result in extracted if result]
+    stages["clean"] = _stage(time.perf_counter() - start, len(cleaned),
+                             characters=sum(len(text) for _, _, text in cleaned))
+
+    chunker = Chunker()
+    start = time.perf_counter()
+    chunks = [chunk for url, title, text in cleaned for chunk in chunker.chunk(text, url, title)]
+    stages["chunk"] = _stage(time.perf_counter() - start, len(chunks))
+
+    vs_wrapper = VectorStore(collection_name="benchmark-stages")
+    start = time.perf_counter()
+    vs_wrapper.create_collection(chunks, embedding_function)
+    stages["vectorstore"] = _stage(time.perf_counter() - start, len(chunks))
+    vs_wrapper.delete_collection()
+    return stages
+
+
+def bench_indexer(url: str, pages: int, user, embedding_function) -> Dict:
+    """The streamed pipeline as an index job runs it; also builds the collection the chat benchmark queries."""
+    from chat.backend.indexer import Indexer
+    from chat.models import SiteCollection
+
+    collection = SiteCollection.for_site(user, url)
+    start = time.perf_counter()
+    stats = Indexer(embedding_function, collection.name, max_pages=pages).run(url)
+    seconds = time.perf_counter() - start
+    SiteCollection.objects.filter(pk=collection.pk).update(chunk_count=stats["chunks_total"])
+    return {"seconds": round(seconds, 4), **stats}
+
+
+async def _chat_worker(client, questions: List[str], latencies: List[float], errors: List[str]):
+    from asgiref.sync import ThreadSensitiveContext
+
+    for question in questions:
+        start = time.perf_counter()
+        # As Django's ASGIHandler does per request; without it the test client runs every request's
+        # sync middleware (WhiteNoise) on one shared thread and serialises concurrent chats.
+        async with ThreadSensitiveContext():
+            response = await client.post("/api/chat/", {"message": question}, content_type="application/json")
+        latencies.append(time.perf_counter() - start)
+        data = response.json()
+        if response.status_code != 200 or "error" in data or str(data.get("answer", "")).startswith("Error:"):
+            errors.append(data.get("error") or data.get("answer") or f"HTTP {response.status_code}")
+
+
+async def _bench_chat(user, questions: List[str], concurrency: int) -> Dict:
+    from django.test import AsyncClient
+
+    clients = []
+    for _ in range(concurrency):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        clients.append(client)
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _chat_worker(client, questions[i::concurrency], latencies, errors) for i, client in enumerate(clients)
+    ))
+    wall = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "mean_ms": round(sum(latencies) * 1000 / len(latencies), 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "throughput_rps": round(len(latencies) / wall, 2),
+    }
+
+
+def bench_chat(user, questions: List[str], concurrency: int) -> Dict:
+    return asyncio.run(_bench_chat(user, questions, max(1, concurrency)))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# Metrics compared against a baseline; larger is worse for all of them.
+REGRESSION_METRICS = [
+    ("stages.crawl.seconds", lambda r: r["stages"]["crawl"]["seconds"]),
+    ("stages.extract.seconds", lambda r: r["stages"]["extract"]["seconds"]),
+    ("stages.clean.seconds", lambda r: r["stages"]["clean"]["seconds"]),
+    ("stages.chunk.seconds", lambda r: r["stages"]["chunk"]["seconds"]),
+    ("stages.vectorstore.seconds", lambda r: r["stages"]["vectorstore"]["seconds"]),
+    ("indexer.seconds", lambda r: r["indexer"]["seconds"]),
+    ("chat.p50_ms", lambda r: r["chat"]["p50_ms"]),
+    ("chat.p95_ms", lambda r: r["chat"]["p95_ms"]),
+]
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Metrics more than `tolerance` (a fraction) slower than in `baseline`."""
+    regressions = []
+    for name, read in REGRESSION_METRICS:
+        try:
+            old, new = read(baseline), read(results)
+        except (KeyError, TypeError):
+            continue
+        if old and new > old * (1 + tolerance):
+            regressions.append({"metric": name, "baseline": old, "current": new, "change": round(new / old - 1, 3)})
+    return regressions
+
+
+def _print_summary(results: Dict):
+    site = results["site"]
+    print(f"Synthetic site: {site['pages']} pages ({site['shape']}), {site['total_bytes'] / 1024:.0f} KiB", file=sys.stderr)
+    for name, stage in results["stages"].items():
+        per_item = f"{stage['ms_per_item']:.2f} ms/item" if stage["ms_per_item"] is not None else "-"
+        print(f"  {name:<12} {stage['seconds']:>8.3f}s  {stage['items']:>6} items  {per_item}", file=sys.stderr)
+    indexer = results["indexer"]
+    print(f"  {'indexer':<12} {indexer['seconds']:>8.3f}s  {indexer['pages_fetched']} pages, {indexer['vectors_written']} vectors", file=sys.stderr)
+    chat = results["chat"]
+    print(f"api_chat: {chat['requests']} requests x{chat['concurrency']}: p50 {chat['p50_ms']} ms, "
+          f"p95 {chat['p95_ms']} ms, {chat['throughput_rps']} req/s, {chat['errors']} errors", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--links-per-page", type=int, default=4)
+    parser.add_argument("--paragraphs", type=int, default=8)
+    parser.add_argument("--words-per-paragraph", type=int, default=80)
+    parser.add_argument("--shape", choices=SyntheticSite.SHAPES, default="tree")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vector-store", default="local", help="VECTOR_STORE_PROVIDER for the run")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="seconds per fake embedding call")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before the fake LLM's first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="seconds per fake LLM token")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent chat sessions")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON to stdout")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary work directory")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = tempfile.mkdtemp(prefix="web-chat-bench-")
+    cwd = os.getcwd()
+    _configure_environment(workdir, args.vector_store)
+    try:
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.contrib.auth import get_user_model
+        from django.test.utils import setup_test_environment
+        from chat.backend.registry import registry
+        from benchmarks.fakes import FakeEmbeddings, FakeLLM
+
+        call_command("migrate", verbosity=0)
+        # Lets the test client's "testserver" host through ALLOWED_HOSTS.
+        setup_test_environment()
+        user = get_user_model().objects.create_user("benchmark", password="benchmark")
+
+        embeddings = FakeEmbeddings(latency=args.embedding_latency)
+        registry.configure(embedding_function=embeddings,
+                           llm=FakeLLM(latency=args.llm_latency, token_delay=args.llm_token_delay))
+        embedding_function = registry.get_embedding_function()
+
+        site = SyntheticSite(args.pages, args.links_per_page, args.paragraphs, args.words_per_paragraph,
+                             args.shape, args.seed)
+        with serve(site) as url:
+            results = {
+                "meta": {
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "commit": _git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "vector_store": args.vector_store,
+                    "embedding_latency": args.embedding_latency,
+                    "llm_latency": args.llm_latency,
+                    "llm_token_delay": args.llm_token_delay,
+                },
+                "site": site.describe(),
+                "stages": bench_stages(url, args.pages, embedding_function),
+                "indexer": bench_indexer(url, args.pages, user, embedding_function),
+            }
+            results["chat"] = bench_chat(user, site.questions(args.questions), args.concurrency)
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if baseline is not None:
+        results["regressions"] = compare(results, baseline, args.tolerance)
+
+    _print_summary(results)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if results.get("regressions"):
+        for regression in results["regressions"]:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                  f"(+{regression['change']:.0%})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
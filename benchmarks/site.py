@@ -0,0 +1,139 @@
+"""A synthetic website served from memory over a local HTTP server."""
+import hashlib
+import random
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+
+WORDS = (
+    "account api backup billing cache cluster config deploy domain endpoint error export feature "
+    "gateway index invoice key latency limit log metric migration model node plan policy project "
+    "quota region release replica request role schedule schema secret server service session "
+    "storage support team token trial upgrade usage user version volume webhook workspace"
+).split()
+
+FOOTER = "<p>Copyright Example Corp. All rights reserved. Privacy policy. Terms of service. Cookie settings.</p>"
+
+
+class SyntheticSite:
+    """`pages` HTML pages linked as a tree (`links_per_page` children each), a chain, or a random mesh.
+
+    Each page has a title, shared navigation and footer boilerplate, and `paragraphs` paragraphs of
+    `words_per_paragraph` words, with one unique code (e.g. "ERR-0042") per page for exact-term queries.
+    Content is generated from `seed`, so runs with the same parameters crawl identical sites.
+    """
+
+    SHAPES = ("tree", "chain", "mesh")
+
+    def __init__(self, pages: int = 50, links_per_page: int = 4, paragraphs: int = 8,
+                 words_per_paragraph: int = 80, shape: str = "tree", seed: int = 0):
+        if shape not in self.SHAPES:
+            raise ValueError(f"shape must be one of {self.SHAPES}")
+        self.pages = max(1, pages)
+        self.links_per_page = links_per_page
+        self.paragraphs = paragraphs
+        self.words_per_paragraph = words_per_paragraph
+        self.shape = shape
+        self.seed = seed
+        self._nav = "".join(f'<li><a href="{self.path(i)}">Section {i}</a></li>' for i in range(min(8, self.pages)))
+        self._html = {self.path(i): self._render(i) for i in range(self.pages)}
+
+    @staticmethod
+    def path(i: int) -> str:
+        return "/index.html" if i == 0 else f"/page/{i}.html"
+
+    @staticmethod
+    def code(i: int) -> str:
+        return f"ERR-{i:04d}"
+
+    def _links(self, i: int, rng: random.Random) -> List[int]:
+        if self.shape == "chain":
+            return [i + 1] if i + 1 < self.pages else []
+        if self.shape == "mesh":
+            return rng.sample(range(self.pages), min(self.links_per_page, self.pages))
+        first = i * self.links_per_page + 1
+        return list(range(first, min(first + self.links_per_page, self.pages)))
+
+    def _render(self, i: int) -> str:
+        rng = random.Random(f"{self.seed}:{i}")
+        topic = rng.choice(WORDS)
+        body = "".join(
+            f"<p>{' '.join(rng.choice(WORDS) for _ in range(self.words_per_paragraph))}.</p>"
+            for _ in range(self.paragraphs)
+        )
+        links = "".join(f'<li><a href="{self.path(j)}">Related {j}</a></li>' for j in self._links(i, rng))
+        return (
+            f"<!DOCTYPE html><html><head><title>{topic.title()} guide {i}</title></head><body>"
+            f"<nav><ul>{self._nav}</ul></nav>"
+            f"<main><article><h1>{topic.title()} guide {i}</h1>"
+            f"<p>Error code {self.code(i)} means the {topic} step failed; retry after checking the {topic} settings.</p>"
+            f"{body}<ul>{links}</ul></article></main>"
+            f"<footer>{FOOTER}</footer></body></html>"
+        )
+
+    def questions(self, count: int) -> List[str]:
+        """Deterministic mix of natural-language and exact-code questions about the site."""
+        rng = random.Random(f"{self.seed}:questions")
+        questions = []
+        for n in range(count):
+            i = rng.randrange(self.pages)
+            if n % 4 == 3:
+                questions.append(f"What does {self.code(i)} mean?")
+            else:
+                questions.append(f"How do I fix a {rng.choice(WORDS)} {rng.choice(WORDS)} problem?")
+        return questions
+
+    def response(self, path: str):
+        if path == "/robots.txt":
+            return 200, "text/plain", "User-agent: *\nAllow: /\n"
+        if path in ("/", ""):
+            path = "/index.html"
+        html = self._html.get(path)
+        if html is None:
+            return 404, "text/html", "<html><body>Not found</body></html>"
+        return 200, "text/html; charset=utf-8", html
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(html.encode("utf-8")) for html in self._html.values())
+
+    def describe(self) -> Dict:
+        return {"pages": self.pages, "links_per_page": self.links_per_page, "paragraphs": self.paragraphs,
+                "words_per_paragraph": self.words_per_paragraph, "shape": self.shape, "seed": self.seed,
+                "total_bytes": self.total_bytes}
+
+
+@contextmanager
+def serve(site: SyntheticSite, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Serve `site` on a background thread; yields the start URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, content_type, body = site.response(self.path.split("?", 1)[0])
+            payload = body.encode("utf-8")
+            # ETags let re-index runs exercise conditional GET.
+            etag = f'"{hashlib.md5(payload).hexdigest()}"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="synthetic-site", daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}/index.html"
+    finally:
+        server.shutdown()
+        server.server_close()
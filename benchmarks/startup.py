@@ -0,0 +1,157 @@
+"""Startup benchmark: cold import time per module and per-worker memory with and without preloading.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+
+    python benchmarks/startup.py            # table
+    python benchmarks/startup.py --json     # machine-readable
+    python benchmarks/startup.py --workers 4
+
+Per-worker memory forks `--workers` children from a parent that has (preload) or has not
+(no preload) run the warm-up, lets each child warm up as a gunicorn worker would, and reports
+the children's private memory. Shared copy-on-write pages are what preloading saves.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "chat.views",
+    "chat.backend.registry",
+    "chat.backend.vectorstore",
+    "chat.backend.qa_chain",
+    "chat.backend.indexer",
+    "chat.backend.local_index",
+    "langchain_groq",
+    "chromadb",
+    "langchain_community.vectorstores",
+    "pinecone",
+    "langchain_pinecone",
+    "langchain_huggingface",
+    "fastembed",
+]
+
+SETUP = """
+import os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "web_chat_project.settings")
+sys.path.insert(0, {root!r})
+import django
+django.setup()
+"""
+
+IMPORT_PROBE = SETUP + """
+import importlib, json
+start = time.perf_counter()
+try:
+    importlib.import_module({module!r})
+    error = None
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+print(json.dumps({{"seconds": time.perf_counter() - start, "rss_mb": rss_mb(), "error": error}}))
+"""
+
+FORK_PROBE = SETUP + """
+import json
+from chat.backend.warmup import warm_up, warm_worker
+if {preload!r}:
+    warm_up()
+children = []
+for _ in range({workers!r}):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        warm_worker()
+        os.write(write_fd, json.dumps(memory()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    children.append((pid, read_fd))
+workers = []
+for pid, read_fd in children:
+    with os.fdopen(read_fd) as pipe:
+        workers.append(json.loads(pipe.read()))
+    os.waitpid(pid, 0)
+print(json.dumps({{"parent": memory(), "workers": workers}}))
+"""
+
+MEMORY_HELPERS = """
+def rss_mb():
+    import resource
+    scale = 1024 if sys.platform != "darwin" else 1024 * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def memory():
+    # smaps_rollup separates shared (copy-on-write) from private pages; elsewhere only peak RSS is known.
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.split()[-1] == "kB"}
+        return {"rss_mb": fields["Rss"] / 1024, "pss_mb": fields["Pss"] / 1024,
+                "private_mb": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024}
+    except OSError:
+        return {"rss_mb": rss_mb(), "pss_mb": None, "private_mb": None}
+"""
+
+def _run(code: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", MEMORY_HELPERS + code], cwd=ROOT,
+                            capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "probe failed")
+    return json.loads(lines[-1])
+
+def measure_imports(modules):
+    baseline = _run(IMPORT_PROBE.format(root=ROOT, module="json"))
+    results = {}
+    for module in modules:
+        result = _run(IMPORT_PROBE.format(root=ROOT, module=module))
+        result["rss_delta_mb"] = result["rss_mb"] - baseline["rss_mb"]
+        results[module] = result
+    return {"baseline_rss_mb": baseline["rss_mb"], "modules": results}
+
+def measure_workers(workers: int):
+    results = {}
+    for label, preload in (("preload", True), ("no_preload", False)):
+        try:
+            results[label] = _run(FORK_PROBE.format(root=ROOT, preload=preload, workers=workers))
+        except RuntimeError as e:
+            results[label] = {"error": str(e)}
+    return results
+
+def _print_report(report):
+    imports = report["imports"]
+    print(f"Cold imports (fresh interpreter, Django set up; baseline RSS {imports['baseline_rss_mb']:.0f} MB)")
+    print(f"  {'module':<36} {'seconds':>8} {'+RSS MB':>8}")
+    for module, result in imports["modules"].items():
+        if result["error"]:
+            print(f"  {module:<36} {'-':>8} {'-':>8}  ({result['error'][:60]})")
+        else:
+            print(f"  {module:<36} {result['seconds']:>8.3f} {result['rss_delta_mb']:>8.1f}")
+
+    print(f"\nPer-worker memory, {report['workers_count']} forked workers")
+    for label, result in report["workers"].items():
+        if "error" in result:
+            print(f"  {label:<11} failed: {result['error']}")
+            continue
+        for i, worker in enumerate(result["workers"]):
+            private = f"{worker['private_mb']:.1f}" if worker["private_mb"] is not None else "n/a"
+            print(f"  {label:<11} worker {i}: RSS {worker['rss_mb']:.1f} MB, private {private} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    report = {"imports": measure_imports(args.modules), "workers_count": args.workers}
+    report["workers"] = measure_workers(args.workers) if hasattr(os, "fork") else {}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+if __name__ == "__main__":
+    main()
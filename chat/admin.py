@@ -1,3 +1,27 @@
 from django.contrib import admin
+from .models import ChatMessage, Conversation, IndexJob, SiteCollection
 
-# Register your models here.
+
+@admin.register(IndexJob)
+class IndexJobAdmin(admin.ModelAdmin):
+    list_display = ('url', 'user', 'status', 'stage', 'pages_fetched', 'chunks_count', 'vectors_written', 'created_at')
+    list_filter = ('status',)
+
+
+@admin.register(SiteCollection)
+class SiteCollectionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'site_domain', 'chunk_count', 'last_indexed_at', 'last_used_at')
+    search_fields = ('site_domain', 'name')
+
+
+class ChatMessageInline(admin.TabularInline):
+    model = ChatMessage
+    fields = ('role', 'content', 'created_at')
+    readonly_fields = ('created_at',)
+    extra = 0
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'created_at')
+    inlines = [ChatMessageInline]
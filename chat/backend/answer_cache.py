@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Union
+import numpy as np
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+class AnswerCache:
+    """LRU + TTL cache of QA results keyed by (collection version, conversation history, normalized query).
+
+    When a query embedding is supplied, a miss on the exact key falls back to the most similar
+    cached query with the same collection version and history above `similarity_threshold`.
+    Follow-up questions ("what about pricing?") depend on the history, so they only hit answers
+    given in an identical conversation.
+    """
+
+    def __init__(self, max_entries: int = Config.ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: float = Config.ANSWER_CACHE_TTL,
+                 similarity_threshold: Optional[float] = Config.ANSWER_CACHE_SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return _WHITESPACE.sub(" ", query or "").strip().lower().rstrip("?!. ")
+
+    @staticmethod
+    def history_key(chat_history: Union[str, List[Dict[str, str]], None]) -> str:
+        """Digest of the conversation so far; empty for the first question of a conversation."""
+        if not chat_history:
+            return ""
+        if not isinstance(chat_history, str):
+            chat_history = json.dumps([(m.get("role"), m.get("content")) for m in chat_history], ensure_ascii=False)
+        return hashlib.sha256(chat_history.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(vector: Optional[List[float]]) -> Optional[np.ndarray]:
+        if vector is None:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else None
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, namespace: Hashable, query: str, query_vector: Optional[List[float]] = None,
+            chat_history: Union[str, List[Dict[str, str]], None] = None) -> Optional[Dict[str, Any]]:
+        key = (namespace, self.history_key(chat_history), self.normalize(query))
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+
+            if entry is None and query_vector is not None and self.similarity_threshold is not None:
+                unit = self._unit(query_vector)
+                if unit is not None:
+                    candidates = [(k, e) for k, e in self._entries.items() if k[:2] == key[:2] and e["vector"] is not None]
+                    if candidates:
+                        scores = np.stack([e["vector"] for _, e in candidates]) @ unit
+                        best = int(np.argmax(scores))
+                        if scores[best] >= self.similarity_threshold:
+                            key, entry = candidates[best]
+                            logger.info(f"Semantic answer cache hit (similarity {scores[best]:.3f}) for: {query}")
+
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry["result"]
+
+    def put(self, namespace: Hashable, query: str, result: Dict[str, Any], query_vector: Optional[List[float]] = None,
+            chat_history: Union[str, List[Dict[str, str]], None] = None):
+        key = (namespace, self.history_key(chat_history), self.normalize(query))
+        with self._lock:
+            self._entries[key] = {
+                "result": result,
+                "vector": self._unit(query_vector),
+                "expires_at": time.monotonic() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def drop(self, collection_name: str):
+        """Remove every entry belonging to a collection, whatever its version."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0][0] == collection_name]:
+                del self._entries[key]
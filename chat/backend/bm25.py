@@ -0,0 +1,159 @@
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+from langchain_core.documents import Document
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Keeps codes, versions and identifiers ("E-1042", "v2.3", "max_tokens") together as one term.
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+_PARTS = re.compile(r"[-_.]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it its me my of on or our "
+    "so than that the their them then there these they this to was we were what when where which "
+    "who why will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound tokens also contribute their parts so "E-1042" matches "1042"."""
+    terms = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = _PARTS.split(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+def is_exact_term(token: str) -> bool:
+    """Looks like a code, version or identifier rather than a plain word."""
+    return any(c.isdigit() for c in token) or bool(_PARTS.search(token))
+
+class BM25Index:
+    """Inverted BM25 index over one collection's chunks, stored in SQLite next to the vector store.
+
+    Chunks are keyed by the same chunk IDs as their vectors so both stay in step through
+    incremental updates. Matching chunks are returned as Documents without touching the vector store.
+    """
+
+    def __init__(self, collection_name: str, directory: str = Config.BM25_INDEX_PATH,
+                 k1: float = Config.BM25_K1, b: float = Config.BM25_B):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{collection_name}.sqlite3")
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id)")
+        self._conn.commit()
+
+    def add(self, documents: Iterable[Document]):
+        rows, postings = [], []
+        for doc in documents:
+            doc_id = doc.metadata["chunk_id"]
+            counts = Counter(tokenize(doc.page_content))
+            rows.append((doc_id, doc.page_content, json.dumps(doc.metadata), sum(counts.values())))
+            postings.extend((term, doc_id, tf) for term, tf in counts.items())
+        if not rows:
+            return
+        with self._lock:
+            self._delete_locked([row[0] for row in rows])
+            self._conn.executemany("INSERT INTO chunks (id, text, metadata, length) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+            self._conn.commit()
+
+    def _delete_locked(self, ids: List[str]):
+        # SQLite limits the number of bound parameters, so delete in slices.
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+
+    def delete(self, ids: Iterable[str]):
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            self._delete_locked(ids)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def destroy(self):
+        """Close the index and remove its files."""
+        with self._lock:
+            self._conn.close()
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path + suffix)
+                except FileNotFoundError:
+                    pass
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM chunks")}
+
+    def search(self, query: str, k: int) -> List[Dict]:
+        """Top `k` chunks as {"id", "score", "matched", "document"}, best first; "matched" is the set of query terms found."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+
+        with self._lock:
+            total, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+            avg_length = avg_length or 1.0
+            scores: Dict[str, float] = {}
+            matched: Dict[str, Set[str]] = {}
+            for term in terms:
+                postings = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                    matched.setdefault(chunk_id, set()).add(term)
+
+            best = sorted(scores, key=scores.get, reverse=True)[:k]
+            if not best:
+                return []
+            placeholders = ",".join("?" * len(best))
+            stored = {
+                row[0]: Document(page_content=row[1], metadata=json.loads(row[2]))
+                for row in self._conn.execute(f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", best)
+            }
+        return [
+            {"id": chunk_id, "score": scores[chunk_id], "matched": matched[chunk_id], "document": stored[chunk_id]}
+            for chunk_id in best if chunk_id in stored
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
@@ -3,6 +3,8 @@ from typing import List, Dict, Any
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from chat.config import Config
+from chat.backend.hashing import content_hash, chunk_id
+from chat.backend import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +22,16 @@ class Chunker:
             logger.warning("Attempted to chunk empty text.")
             return []
             
-        metadata = {"source": source_url, "title": title} 
-        
-        chunks = self.splitter.create_documents([text], metadatas=[metadata])
-        
-        chunks = [c for c in chunks if c.page_content and c.page_content.strip()]
+        with metrics.timer("chunk"):
+            metadata = {"source": source_url, "title": title, "page_hash": content_hash(text)} 
+            
+            chunks = self.splitter.create_documents([text], metadatas=[metadata])
+            
+            chunks = [c for c in chunks if c.page_content and c.page_content.strip()]
+            for c in chunks:
+                c.metadata["chunk_hash"] = content_hash(c.page_content)
+                c.metadata["chunk_id"] = chunk_id(source_url, c.page_content)
+        metrics.inc(metrics.CHUNKS, len(chunks))
         
         logger.info(f"Split text into {len(chunks)} chunks for {source_url}.")
         return chunks
@@ -1,74 +1,200 @@
 import logging
+import threading
 import time
-from typing import List, Dict, Set
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Set, Iterator, Optional
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 from chat.config import Config
+from chat.backend.http_client import get_session
+from chat.backend.discovery import Discovery
+from chat.backend.document import ParsedPage
+from chat.backend import metrics
 from collections import deque
 
 logger = logging.getLogger(__name__)
 
 class Crawler:
-    
-    def crawl(self, start_url: str, limit: int = Config.MAX_PAGES_CRAWL) -> List[Dict[str, str]]:
+
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+
+    def __init__(self, concurrency: int = Config.CRAWL_CONCURRENCY, per_host_concurrency: int = Config.CRAWL_PER_HOST_CONCURRENCY,
+                 fetch_cache=None, use_sitemaps: bool = Config.USE_SITEMAPS, respect_robots: bool = Config.RESPECT_ROBOTS_TXT):
+        self.concurrency = max(1, concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.fetch_cache = fetch_cache
+        self.use_sitemaps = use_sitemaps
+        self.respect_robots = respect_robots
+        self.crawl_delay: Optional[float] = None
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_request_at: Dict[str, float] = {}
+        self._host_lock = threading.Lock()
+
+    def crawl(self, start_url: str, limit: int = Config.MAX_PAGES_CRAWL,
+              seed_response: Optional[requests.Response] = None) -> List[Dict[str, str]]:
+        results = list(self.iter_crawl(start_url, limit, seed_response=seed_response))
+        logger.info(f"Crawl complete. Visited {len(results)} pages.")
+        return results
+
+    def iter_crawl(self, start_url: str, limit: int = Config.MAX_PAGES_CRAWL,
+                   seed_response: Optional[requests.Response] = None) -> Iterator[Dict[str, str]]:
+        """Yield pages as soon as they are fetched, keeping up to `concurrency` requests in flight.
+
+        `seed_response` is an already-downloaded response for `start_url` (e.g. from the gateway
+        validator, possibly a 304 to its conditional request), used instead of fetching the start
+        page again. Pages answered with 304 Not
+        Modified are yielded with ``html=None`` and ``not_modified=True``. Fetched pages carry
+        their parsed ``document`` so later stages do not parse the HTML again.
+        """
         if not start_url:
             raise ValueError("URL cannot be empty")
-            
-        logger.info(f"Starting crawl for {start_url} with limit {limit}")
-        
+
+        logger.info(f"Starting crawl for {start_url} with limit {limit} (concurrency {self.concurrency})")
+
         base_domain = urlparse(start_url).netloc
-        queue = deque([start_url])
+        frontier = deque([start_url])
         visited: Set[str] = set([start_url])
-        results: List[Dict[str, str]] = []
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-        }
+        produced = 0
+
+        # The start URL was explicitly requested, so robots rules apply only to discovered URLs.
+        discovery = self._discover(start_url)
+        for url in discovery.sitemap_urls() if self.use_sitemaps else []:
+            if url not in visited:
+                visited.add(url)
+                frontier.append(url)
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawler")
+        in_flight = {}
+        if seed_response is not None:
+            seed = Future()
+            url = frontier.popleft()
+            cached = self.fetch_cache.get(url) if self.fetch_cache else None
+            seed.set_result(self._handle_response(url, seed_response, base_domain, cached))
+            in_flight[seed] = start_url
+        try:
+            while (frontier or in_flight) and produced < limit:
+                # Never schedule more fetches than pages we can still accept.
+                while frontier and len(in_flight) < self.concurrency and produced + len(in_flight) < limit:
+                    url = frontier.popleft()
+                    in_flight[executor.submit(self._fetch, url, base_domain)] = url
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.pop(future)
+                    page = future.result()
+                    if page is None or produced >= limit:
+                        continue
+
+                    produced += 1
+                    yield {
+                        "url": page["url"],
+                        "html": page["html"],
+                        "document": page.get("document"),
+                        "not_modified": page.get("not_modified", False),
+                    }
+
+                    if produced < limit:
+                        for link in page["links"]:
+                            if link not in visited:
+                                visited.add(link)
+                                if discovery.can_fetch(link):
+                                    frontier.append(link)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        while queue and len(results) < limit:
-            current_url = queue.popleft()
-            
-            try:
-                time.sleep(0.5)
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_concurrency)
+                self._host_slots[host] = slot
+            return slot
 
+    def _discover(self, start_url: str) -> Discovery:
+        # Without robots enforcement robots.txt is still read for its Sitemap: lines.
+        discovery = Discovery(start_url, user_agent=self.headers["User-Agent"], enforce_robots=self.respect_robots)
+        if self.respect_robots or self.use_sitemaps:
+            discovery.load_robots()
+        if self.respect_robots:
+            self.crawl_delay = discovery.crawl_delay()
+            if self.crawl_delay:
+                logger.info(f"Honouring robots.txt crawl-delay of {self.crawl_delay}s")
+        return discovery
+
+    def _throttle(self, host: str):
+        """Space request starts to the same host by the robots.txt crawl-delay, across all fetch threads."""
+        if not self.crawl_delay:
+            return
+        with self._host_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at.get(host, now))
+            self._next_request_at[host] = start_at + self.crawl_delay
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def _fetch(self, current_url: str, base_domain: str) -> Optional[Dict]:
+        try:
+            headers = self.headers
+            cached = self.fetch_cache.get(current_url) if self.fetch_cache else None
+            if cached:
+                headers = {**self.headers, **self.fetch_cache.conditional_headers(current_url)}
+
+            host = urlparse(current_url).netloc
+            with self._host_slot(host):
+                self._throttle(host)
                 logger.info(f"Fetching: {current_url}")
-                response = requests.get(current_url, timeout=Config.REQUEST_TIMEOUT, headers=headers)
-                
-                if response.status_code != 200:
-                    logger.warning(f"Failed to fetch {current_url}: Status {response.status_code}")
-                    continue
-                
-                final_domain = urlparse(response.url).netloc
-                if final_domain != base_domain:
-                    logger.warning(f"Redirected off-domain to {final_domain}. Skipping.")
-                    continue
-
-                if "text/html" not in response.headers.get("Content-Type", "").lower():
-                    logger.warning(f"Skipping non-HTML content: {current_url}")
-                    continue
-
-                html_content = response.text
-                results.append({"url": response.url, "html": html_content}) 
-                
-                if len(results) < limit:
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    for link in soup.find_all('a', href=True):
-                        raw_href = link['href']
-                        absolute_url = urljoin(current_url, raw_href)
-                        
-                        parsed_href = urlparse(absolute_url)
-                        clean_url = parsed_href._replace(fragment="").geturl()
-
-                        if parsed_href.netloc == base_domain and clean_url not in visited:
-                            visited.add(clean_url)
-                            queue.append(clean_url)
-                            
-            except Exception as e:
-                logger.error(f"Error crawling {current_url}: {e}")
-                continue
-                
-        logger.info(f"Crawl complete. Visited {len(results)} pages.")
-        return results
+                # Timed after the host slot and politeness delay: this is the server's share.
+                with metrics.timer("crawl_fetch"):
+                    response = get_session().get(current_url, timeout=Config.REQUEST_TIMEOUT, headers=headers)
+
+            return self._handle_response(current_url, response, base_domain, cached)
+
+        except Exception as e:
+            logger.error(f"Error crawling {current_url}: {e}")
+            metrics.inc(metrics.PAGES_FETCHED, status="failed")
+            return None
+
+    def _handle_response(self, current_url: str, response: requests.Response, base_domain: str,
+                         cached: Optional[Dict]) -> Optional[Dict]:
+        if response.status_code == 304 and cached:
+            logger.info(f"Not modified: {current_url}")
+            metrics.inc(metrics.PAGES_FETCHED, status="not_modified")
+            return {"url": cached["final_url"], "html": None, "not_modified": True, "links": cached["links"]}
+
+        page = self._process_response(current_url, response, base_domain)
+        metrics.inc(metrics.PAGES_FETCHED, status="ok" if page else "failed")
+        return page
+
+    def _process_response(self, current_url: str, response: requests.Response, base_domain: str) -> Optional[Dict]:
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch {current_url}: Status {response.status_code}")
+            return None
+
+        final_domain = urlparse(response.url).netloc
+        if final_domain != base_domain:
+            logger.warning(f"Redirected off-domain to {final_domain}. Skipping.")
+            return None
+
+        if "text/html" not in response.headers.get("Content-Type", "").lower():
+            logger.warning(f"Skipping non-HTML content: {current_url}")
+            return None
+
+        html_content = response.text
+        document = ParsedPage(html_content)
+        links = document.links(current_url, base_domain)
+        if self.fetch_cache:
+            self.fetch_cache.put(current_url, response.url, response.headers.get("ETag"), response.headers.get("Last-Modified"), links)
+
+        return {
+            "url": response.url,
+            "html": html_content,
+            "document": document,
+            "links": links,
+        }
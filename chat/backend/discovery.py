@@ -0,0 +1,137 @@
+import gzip
+import io
+import logging
+import xml.etree.ElementTree as ET
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, urljoin
+from urllib.robotparser import RobotFileParser
+from chat.config import Config
+from chat.backend.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def _lastmod_timestamp(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+def _read_capped(stream, limit: int, **read_kwargs) -> bytes:
+    """Read `stream` to the end, raising ValueError once more than `limit` bytes have been read."""
+    chunks, total = [], 0
+    while True:
+        chunk = stream.read(min(64 * 1024, limit + 1 - total), **read_kwargs)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+        total += len(chunk)
+        if total > limit:
+            raise ValueError(f"larger than {limit} bytes")
+
+class Discovery:
+    """Reads robots.txt and sitemaps (plain, gzipped and sitemap indexes) to seed the crawl frontier."""
+
+    def __init__(self, start_url: str, user_agent: str = Config.USER_AGENT,
+                 max_sitemaps: int = Config.SITEMAP_MAX_FILES, max_urls: int = Config.SITEMAP_MAX_URLS,
+                 max_sitemap_bytes: int = Config.SITEMAP_MAX_BYTES, enforce_robots: bool = True):
+        parsed = urlparse(start_url)
+        self.origin = f"{parsed.scheme}://{parsed.netloc}"
+        self.base_domain = parsed.netloc
+        self.user_agent = user_agent
+        self.max_sitemaps = max_sitemaps
+        self.max_urls = max_urls
+        self.max_sitemap_bytes = max_sitemap_bytes
+        self.enforce_robots = enforce_robots
+        self.robots: Optional[RobotFileParser] = None
+
+    def _get(self, url: str, stream: bool = False):
+        return get_session().get(url, timeout=Config.REQUEST_TIMEOUT, headers={"User-Agent": self.user_agent}, stream=stream)
+
+    def load_robots(self) -> Optional[RobotFileParser]:
+        robots_url = urljoin(self.origin, "/robots.txt")
+        try:
+            response = self._get(robots_url)
+        except Exception as e:
+            logger.warning(f"Could not fetch {robots_url}: {e}")
+            return None
+        if response.status_code != 200:
+            # No robots.txt (or an error page) means no restrictions.
+            return None
+        parser = RobotFileParser(robots_url)
+        parser.parse(response.text.splitlines())
+        self.robots = parser
+        return parser
+
+    def can_fetch(self, url: str) -> bool:
+        return not self.enforce_robots or self.robots is None or self.robots.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self) -> Optional[float]:
+        if self.robots is None:
+            return None
+        delay = self.robots.crawl_delay(self.user_agent)
+        if delay is None:
+            rate = self.robots.request_rate(self.user_agent)
+            if rate and rate.requests:
+                delay = rate.seconds / rate.requests
+        return float(delay) if delay else None
+
+    def _read_sitemap(self, url: str) -> Optional[ET.Element]:
+        try:
+            with self._get(url, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                content = _read_capped(response.raw, self.max_sitemap_bytes, decode_content=True)
+            if content[:2] == b"\x1f\x8b":
+                # Cap the decompressed size too: a small .xml.gz can expand to gigabytes.
+                with gzip.GzipFile(fileobj=io.BytesIO(content)) as decompressed:
+                    content = _read_capped(decompressed, self.max_sitemap_bytes)
+            return ET.fromstring(content)
+        except Exception as e:
+            logger.warning(f"Could not read sitemap {url}: {e}")
+            return None
+
+    def sitemap_urls(self) -> List[str]:
+        """Same-domain page URLs from the site's sitemaps, highest priority and most recently modified first."""
+        listed = self.robots.site_maps() if self.robots is not None else None
+        pending = deque(listed or [urljoin(self.origin, "/sitemap.xml")])
+        seen_sitemaps = set()
+        entries: Dict[str, tuple] = {}
+
+        while pending and len(seen_sitemaps) < self.max_sitemaps and len(entries) < self.max_urls:
+            sitemap_url = pending.popleft()
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+
+            root = self._read_sitemap(sitemap_url)
+            if root is None:
+                continue
+
+            is_index = _local_name(root.tag) == "sitemapindex"
+            for node in root:
+                fields = {_local_name(child.tag): (child.text or "").strip() for child in node}
+                loc = fields.get("loc")
+                if not loc:
+                    continue
+                if is_index:
+                    pending.append(loc)
+                    continue
+                if urlparse(loc).netloc != self.base_domain or not self.can_fetch(loc):
+                    continue
+                try:
+                    priority = float(fields.get("priority") or 0.5)
+                except ValueError:
+                    priority = 0.5
+                entries[loc] = (priority, _lastmod_timestamp(fields.get("lastmod")))
+                if len(entries) >= self.max_urls:
+                    break
+
+        logger.info(f"Discovered {len(entries)} URLs from {len(seen_sitemaps)} sitemap file(s) for {self.origin}")
+        return sorted(entries, key=lambda loc: (-entries[loc][0], -entries[loc][1]))
@@ -0,0 +1,49 @@
+import logging
+from typing import List, Optional
+from urllib.parse import urljoin, urlparse
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+class ParsedPage:
+    """One lxml parse of a page, shared by link extraction, title lookup and content extraction."""
+
+    def __init__(self, html: str):
+        self.html = html
+        self._tree = None
+        self._parsed = False
+
+    @property
+    def tree(self) -> Optional[lxml.html.HtmlElement]:
+        if not self._parsed:
+            self._parsed = True
+            try:
+                self._tree = lxml.html.document_fromstring(self.html)
+            except ValueError:
+                # lxml refuses str input that carries an XML encoding declaration.
+                self._tree = lxml.html.document_fromstring(self.html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+            except etree.ParserError as e:
+                logger.warning(f"Could not parse HTML: {e}")
+        return self._tree
+
+    @property
+    def title(self) -> Optional[str]:
+        if self.tree is None:
+            return None
+        title = self.tree.findtext(".//title")
+        return title.strip() if title and title.strip() else None
+
+    def links(self, page_url: str, base_domain: str) -> List[str]:
+        """Absolute, fragment-free same-domain links, resolved against the page URL."""
+        if self.tree is None:
+            return []
+        links = []
+        for anchor in self.tree.iterfind(".//a[@href]"):
+            try:
+                parsed_href = urlparse(urljoin(page_url, anchor.get("href").strip()))
+            except ValueError:
+                continue
+            if parsed_href.netloc == base_domain:
+                links.append(parsed_href._replace(fragment="").geturl())
+        return links
@@ -1,10 +1,41 @@
 import logging
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from typing import List
+from langchain_core.embeddings import Embeddings
 from chat.config import Config
-import logging
+from chat.backend import metrics
 
 logger = logging.getLogger(__name__)
 
+class InstrumentedEmbeddings(Embeddings):
+    """Times calls to the embedding model; sits inside the cache, so only real model calls are counted."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with metrics.timer("embed"):
+            vectors = self.embeddings.embed_documents(texts)
+        metrics.inc(metrics.EMBEDDED_TEXTS, len(texts), kind="documents")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with metrics.timer("embed"):
+            vector = self.embeddings.embed_query(text)
+        metrics.inc(metrics.EMBEDDED_TEXTS, kind="query")
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with metrics.timer("embed"):
+            vectors = await self.embeddings.aembed_documents(texts)
+        metrics.inc(metrics.EMBEDDED_TEXTS, len(texts), kind="documents")
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with metrics.timer("embed"):
+            vector = await self.embeddings.aembed_query(text)
+        metrics.inc(metrics.EMBEDDED_TEXTS, kind="query")
+        return vector
+
 class Embedder:
     
     def __init__(self):
@@ -12,6 +43,13 @@ class Embedder:
         self.provider = getattr(Config, "EMBEDDING_PROVIDER", "huggingface")
         self.model_name = Config.EMBEDDING_MODEL_NAME
         
+    def _with_cache(self, embeddings):
+        embeddings = InstrumentedEmbeddings(embeddings)
+        if not Config.EMBEDDING_CACHE_ENABLED:
+            return embeddings
+        from chat.backend.embedding_cache import CachedEmbeddings
+        return CachedEmbeddings(embeddings, model_name=self.model_name)
+
     def get_embedding_function(self):
         logger.info(f"Initializing {self.provider} embeddings with model: {self.model_name}")
         
@@ -30,12 +68,14 @@ class Embedder:
                     model=self.model_name
                 )
                 logger.info(f"HuggingFace API embeddings initialized successfully ({self.model_name})")
-                return embeddings
-                logger.info(f"HuggingFace API embeddings initialized successfully ({self.model_name})")
-                return embeddings
+                return self._with_cache(embeddings)
             except Exception as e:
                 logger.error(f"Failed to initialize HuggingFace embeddings: {e}")
                 raise e
+        elif self.provider == "local":
+            # In-process CPU model; avoids a network round trip per query
+            from chat.backend.local_embeddings import LocalEmbeddings
+            return self._with_cache(LocalEmbeddings(self.model_name))
         else:
             # Fallback or error for unsupported providers
             raise ValueError(f"Unsupported embedding provider: {self.provider}")
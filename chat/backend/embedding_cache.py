@@ -0,0 +1,113 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Dict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from chat.config import Config
+from chat.backend.hashing import content_hash
+from chat.backend import metrics
+
+logger = logging.getLogger(__name__)
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that stores vectors on disk in SQLite, keyed by model name and text hash, with an LRU bound."""
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 path: str = Config.EMBEDDING_CACHE_PATH,
+                 max_entries: int = Config.EMBEDDING_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind: str, text: str) -> str:
+        return f"{self.model_name}:{kind}:{content_hash(text, length=32)}"
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite limits the number of bound parameters, so look keys up in slices.
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+            )
+            self._size += len(items)
+            if self._size > self.max_entries:
+                self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                overflow = self._size - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (overflow,)
+                    )
+                    self._size -= overflow
+                    logger.info(f"Evicted {overflow} least recently used embeddings from cache.")
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("doc", text) for text in texts]
+        cached = self._lookup(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        metrics.inc(metrics.EMBEDDING_CACHE, len(texts) - len(missing), result="hit")
+        metrics.inc(metrics.EMBEDDING_CACHE, len(missing), result="miss")
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        cached = self._lookup([key])
+        if key in cached:
+            self.hits += 1
+            metrics.inc(metrics.EMBEDDING_CACHE, result="hit")
+            return cached[key]
+
+        self.misses += 1
+        metrics.inc(metrics.EMBEDDING_CACHE, result="miss")
+        vector = self.embeddings.embed_query(text)
+        self._store({key: vector})
+        return vector
@@ -0,0 +1,118 @@
+import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, List, Optional
+from langchain_core.documents import Document
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+def _transport_errors() -> tuple:
+    # Connection failures and timeouts from whichever HTTP client the embedding provider uses.
+    errors = [ConnectionError, TimeoutError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import requests
+        errors.extend([requests.ConnectionError, requests.Timeout])
+    except ImportError:
+        pass
+    return tuple(errors)
+
+TRANSPORT_ERRORS = _transport_errors()
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a failed request, from the exception's response (or the exception itself); None if it has none."""
+    for candidate in (getattr(error, "response", None), error):
+        code = getattr(candidate, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+def _is_retryable(error: Exception) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return isinstance(error, TRANSPORT_ERRORS)
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+class EmbeddingPipeline:
+    """Embeds documents in batches on a thread pool and upserts each batch while later ones are still embedding."""
+
+    def __init__(self, embedding_function,
+                 batch_size: int = Config.EMBEDDING_BATCH_SIZE,
+                 concurrency: int = Config.EMBEDDING_CONCURRENCY,
+                 max_retries: int = Config.EMBEDDING_MAX_RETRIES):
+        self.embedding_function = embedding_function
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+
+    def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                return self.embedding_function.embed_documents(texts)
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = _retry_after(e) or (Config.EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, 0.5))
+                attempt += 1
+                reason = _status_code(e) or type(e).__name__
+                logger.warning(f"Embedding batch failed ({reason}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def run(self, documents: Iterable[Document], upsert: Callable[[List[Document], List[List[float]]], None],
+            progress: Optional[Callable[[int], None]] = None) -> int:
+        """Embed and upsert `documents`, which may be a lazy stream; batches are drawn from it only as workers free up."""
+        source = iter(documents)
+        written = 0
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embedder") as executor:
+            def schedule():
+                batch = list(islice(source, self.batch_size))
+                if not batch:
+                    return False
+                pending.append((batch, executor.submit(self._embed_with_retry, [d.page_content for d in batch])))
+                return True
+
+            # Start with one batch so the first upsert is not held back waiting for a slow upstream
+            # stream to fill `concurrency` batches; the window widens after each write.
+            schedule()
+
+            try:
+                while pending:
+                    batch, future = pending.popleft()
+                    vectors = future.result()
+                    # Queue the next batch before writing so embedding overlaps with the upsert.
+                    schedule()
+                    upsert(batch, vectors)
+                    written += len(batch)
+                    if progress:
+                        progress(written)
+                    while len(pending) < self.concurrency and schedule():
+                        pass
+            except Exception:
+                for _, future in pending:
+                    future.cancel()
+                raise
+
+        if written:
+            logger.info(f"Embedded {written} documents (batch size {self.batch_size}, concurrency {self.concurrency})")
+        return written
@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator
+from chat.config import Config
+from chat.backend.extractor import Extractor
+from chat.backend.cleaner import Cleaner
+from chat.backend import metrics
+
+logger = logging.getLogger(__name__)
+
+def _extract_and_clean(url: str, html: str, document=None) -> Dict:
+    """Extract and clean one page. Module-level so worker processes can unpickle it.
+
+    Stage times travel back in the result: metrics recorded inside a pool worker would stay in that process.
+    """
+    started = time.perf_counter()
+    result = Extractor().extract(html, document=document)
+    extracted = time.perf_counter()
+    text = Cleaner().clean(result["text"]) if result else ""
+    finished = time.perf_counter()
+    return {
+        "url": url,
+        "title": result["title"] if result else None,
+        "text": text or None,
+        "status": "ok" if text else "empty",
+        "seconds": finished - started,
+        "stage_seconds": {"extract": extracted - started, "clean": finished - extracted},
+    }
+
+class ExtractionPool:
+    """Runs Extractor + Cleaner over a stream of crawled pages on a process pool.
+
+    Results come back in input order with per-page timings. A page that exceeds `page_timeout`
+    is reported with status "timeout" and its worker is killed so it cannot stall later pages.
+    With `workers <= 1` pages are processed inline, reusing the crawler's parse tree; the
+    timeout cannot be enforced in that mode.
+    """
+
+    def __init__(self, workers: int = Config.EXTRACTION_WORKERS,
+                 chunk_size: int = Config.EXTRACTION_CHUNK_SIZE,
+                 page_timeout: float = Config.EXTRACTION_PAGE_TIMEOUT):
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.page_timeout = page_timeout
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a process that already runs crawler/job threads is unsafe.
+            context = multiprocessing.get_context(Config.EXTRACTION_START_METHOD)
+            self._pool = context.Pool(self.workers, maxtasksperchild=Config.EXTRACTION_MAX_TASKS_PER_CHILD)
+        return self._pool
+
+    def _kill_pool(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def process(self, pages: Iterable[Dict]) -> Iterator[Dict]:
+        for result in self._process(pages):
+            for stage, seconds in result.get("stage_seconds", {}).items():
+                metrics.observe_stage(stage, seconds)
+            metrics.inc(metrics.PAGES_EXTRACTED, status=result["status"])
+            yield result
+
+    def _process(self, pages: Iterable[Dict]) -> Iterator[Dict]:
+        if self.workers <= 1:
+            for page in pages:
+                yield self._run_inline(page)
+            return
+
+        pending = deque()
+        for page in pages:
+            pending.append((page, self._get_pool().apply_async(_extract_and_clean, (page["url"], page["html"]))))
+            if len(pending) >= self.chunk_size:
+                yield self._collect(pending)
+        while pending:
+            yield self._collect(pending)
+
+    def _run_inline(self, page: Dict) -> Dict:
+        try:
+            return _extract_and_clean(page["url"], page["html"], page.get("document"))
+        except Exception as e:
+            logger.error(f"Extraction failed for {page['url']}: {e}")
+            return {"url": page["url"], "title": None, "text": None, "status": "error", "seconds": 0.0}
+
+    def _collect(self, pending: deque) -> Dict:
+        page, async_result = pending.popleft()
+        started = time.perf_counter()
+        try:
+            return async_result.get(timeout=self.page_timeout)
+        except multiprocessing.TimeoutError:
+            logger.warning(f"Extraction timed out after {self.page_timeout}s: {page['url']}")
+            # The stuck worker cannot be cancelled individually: restart the pool and resubmit the rest.
+            self._kill_pool()
+            requeued = [(p, self._get_pool().apply_async(_extract_and_clean, (p["url"], p["html"]))) for p, _ in pending]
+            pending.clear()
+            pending.extend(requeued)
+            return {"url": page["url"], "title": None, "text": None, "status": "timeout", "seconds": time.perf_counter() - started}
+        except Exception as e:
+            logger.error(f"Extraction failed for {page['url']}: {e}")
+            return {"url": page["url"], "title": None, "text": None, "status": "error", "seconds": time.perf_counter() - started}
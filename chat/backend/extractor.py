@@ -1,59 +1,65 @@
+import copy
 import logging
 import trafilatura
-import re
 from typing import Dict, Optional
+from chat.backend.document import ParsedPage
+from chat.backend.normalizer import normalize
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_DROP_TAGS = ["script", "style", "nav", "footer", "header", "meta", "noscript", "svg", "button"]
+
 class Extractor:
     
-    def extract(self, html_content: str) -> Dict[str, Optional[str]]:
+    def extract(self, html_content: str, document: Optional[ParsedPage] = None) -> Dict[str, Optional[str]]:
+        """Extract main text and title; pass the crawler's `document` to reuse its parse tree."""
         if not html_content:
             logger.warning("Empty HTML content provided for extraction.")
             return None
+        
+        document = document or ParsedPage(html_content)
+        if document.tree is None:
+            logger.warning("HTML could not be parsed for extraction.")
+            return None
             
         text = None
-        title = "Unknown Title"
+        title = document.title or "Unknown Title"
         
-        # 1. Try Trafilatura
+        # 1. Try Trafilatura (it copies the tree it is given, so the shared parse stays intact)
         try:
             data = trafilatura.bare_extraction(
-                html_content, 
+                document.tree, 
                 include_comments=False, 
-                include_tables=True
+                include_tables=True,
+                as_dict=True
             )
             if data and data.get('text'):
                 text = data['text']
-                title = data.get('title', 'Unknown Title')
         except Exception as e:
             logger.warning(f"Trafilatura raised exception: {e}")
             # Continue to fallback
             
         # 2. Fallback to BeautifulSoup if Trafilatura failed/empty
         if not text:
-            logger.warning("Trafilatura failed/empty. using BeautifulSoup fallback.")
+            logger.warning("Trafilatura failed/empty. using plain-text fallback.")
             try:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(html_content, 'html.parser')
+                tree = copy.deepcopy(document.tree)
                 
                 # Remove unwanted tags
-                for tag in soup(["script", "style", "nav", "footer", "header", "meta", "noscript", "svg", "button"]):
-                    tag.decompose()
-                    
-                title = soup.title.string.strip() if soup.title and soup.title.string else "Unknown Title"
+                for tag in list(tree.iter(*FALLBACK_DROP_TAGS)):
+                    tag.drop_tree()
                 
                 # Get text
-                text = soup.get_text(separator='\n\n')
+                text = '\n\n'.join(tree.itertext())
             except Exception as e:
-                logger.error(f"BS4 Fallback failed: {e}")
+                logger.error(f"Fallback extraction failed: {e}")
                 return None
         
         if not text:
             logger.warning("Extraction returned empty data after fallback.")
             return None
         
-        text = text.replace('\xa0', ' ')
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = normalize(text)
         
         if len(text) < 10:
             logger.warning(f"Extracted content too short ({len(text)} chars). Skipping.")
@@ -0,0 +1,102 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+from chat.config import Config
+from chat.backend.normalizer import PageLines
+
+logger = logging.getLogger(__name__)
+
+class FetchCache:
+    """Stores ETag/Last-Modified and outgoing links per URL so re-crawls can send conditional requests.
+
+    Entries are scoped (normally by collection name) because a 304 is only useful if that
+    collection still holds the page's chunks.
+    """
+
+    def __init__(self, scope: str, path: str = Config.FETCH_CACHE_PATH):
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "scope TEXT NOT NULL, url TEXT NOT NULL, final_url TEXT NOT NULL, etag TEXT, last_modified TEXT, links TEXT NOT NULL, "
+            "PRIMARY KEY (scope, url))"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, etag, last_modified, links FROM validators WHERE scope = ? AND url = ?", (self.scope, url)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"final_url": row[0], "etag": row[1], "last_modified": row[2], "links": json.loads(row[3])}
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, final_url: str, etag: Optional[str], last_modified: Optional[str], links: List[str]):
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validators (scope, url, final_url, etag, last_modified, links) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.scope, url, final_url, etag, last_modified, json.dumps(links))
+            )
+            self._conn.commit()
+
+    def forget(self, urls: Iterable[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM validators WHERE scope = ? AND url = ?", [(self.scope, u) for u in urls])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM validators WHERE scope = ?", (self.scope,))
+            self._conn.commit()
+
+class PageLinesCache:
+    """Stores each indexed page's line hashes per collection, so the boilerplate filter can count
+    lines of pages that are not re-extracted (304s) and decide each page as soon as it arrives."""
+
+    def __init__(self, scope: str, path: str = Config.FETCH_CACHE_PATH):
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_lines ("
+            "scope TEXT NOT NULL, url TEXT NOT NULL, lines TEXT NOT NULL, removed TEXT NOT NULL, "
+            "PRIMARY KEY (scope, url))"
+        )
+        self._conn.commit()
+
+    def load(self) -> Dict[str, PageLines]:
+        with self._lock:
+            rows = self._conn.execute("SELECT url, lines, removed FROM page_lines WHERE scope = ?", (self.scope,)).fetchall()
+        return {url: (frozenset(json.loads(lines)), frozenset(json.loads(removed))) for url, lines, removed in rows}
+
+    def replace(self, pages: Dict[str, PageLines]):
+        with self._lock:
+            self._conn.execute("DELETE FROM page_lines WHERE scope = ?", (self.scope,))
+            self._conn.executemany(
+                "INSERT INTO page_lines (scope, url, lines, removed) VALUES (?, ?, ?, ?)",
+                [(self.scope, url, json.dumps(sorted(lines)), json.dumps(sorted(removed))) for url, (lines, removed) in pages.items()]
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM page_lines WHERE scope = ?", (self.scope,))
+            self._conn.commit()
@@ -0,0 +1,8 @@
+import hashlib
+
+def content_hash(text: str, length: int = 16) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:length]
+
+def chunk_id(source_url: str, chunk_text: str) -> str:
+    """Stable vector ID: a per-page prefix followed by the chunk content hash."""
+    return f"{content_hash(source_url)}-{content_hash(chunk_text)}"
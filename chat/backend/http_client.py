@@ -0,0 +1,38 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+def _accept_encoding() -> str:
+    # urllib3 decodes brotli transparently when a brotli package is installed.
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return "gzip, deflate, br"
+        except ImportError:
+            return "gzip, deflate"
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session shared by the validator and crawler threads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=Config.HTTP_POOL_CONNECTIONS, pool_maxsize=Config.HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": Config.USER_AGENT,
+                "Accept-Encoding": _accept_encoding(),
+            })
+            _session = session
+        return _session
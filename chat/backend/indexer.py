@@ -0,0 +1,126 @@
+import logging
+import threading
+from contextlib import closing
+from typing import Callable, Dict, Optional
+from chat.backend.crawler import Crawler
+from chat.backend.extraction_pool import ExtractionPool
+from chat.backend.chunker import Chunker
+from chat.backend.normalizer import BoilerplateFilter
+from chat.backend.vectorstore import VectorStore
+from chat.backend.validator import Validator
+from chat.backend.fetch_cache import FetchCache, PageLinesCache
+from chat.backend.pipeline import buffered
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+class IndexingError(Exception):
+    """Raised when a site could not be indexed; the message is safe to show to the user."""
+
+class Indexer:
+    """Streams crawl -> extract -> clean -> chunk -> embed -> upsert and reports progress as pages flow through."""
+
+    def __init__(self, embedding_function, collection_name: str = "website_content",
+                 progress: Optional[Callable[..., None]] = None, max_pages: int = Config.MAX_PAGES_CRAWL):
+        self.embedding_function = embedding_function
+        self.collection_name = collection_name
+        self.max_pages = max_pages
+        self.progress = progress or (lambda **fields: None)
+        self.stats = {"pages_fetched": 0, "pages_extracted": 0, "chunks_count": 0, "vectors_written": 0}
+        self.timings = []
+        # Each pipeline stage reports from its own thread.
+        self._report_lock = threading.Lock()
+
+    def _report(self, stage: str, **counts):
+        with self._report_lock:
+            self.stats.update(counts)
+            self.progress(stage=stage, **self.stats)
+
+    def run(self, url: str) -> Dict[str, int]:
+        self._report("crawling")
+        # Conditional GET only pays off when unchanged pages keep their existing vectors.
+        fetch_cache = FetchCache(self.collection_name) if Config.INCREMENTAL_INDEXING and Config.CONDITIONAL_GET_ENABLED else None
+        # The gateway request doubles as the start page fetch, so it is conditional too.
+        gateway = Validator.validate_gateway(url, headers=fetch_cache.conditional_headers(url) if fetch_cache else None)
+        if not gateway["valid"]:
+            raise IndexingError(gateway["error"])
+
+        crawler = Crawler(fetch_cache=fetch_cache)
+        unchanged_sources = set()
+        diagnostics = {"first_title": None}
+        page_lines = PageLinesCache(self.collection_name) if Config.BOILERPLATE_FILTER_ENABLED else None
+        boilerplate = BoilerplateFilter(page_lines.load()) if page_lines else None
+
+        # crawl -> extract/clean -> chunk -> embed/upsert run concurrently, each stage on its own thread
+        # behind a bounded queue, so only a queue's worth of pages is held in memory at any time.
+        def changed_pages():
+            for page in crawler.iter_crawl(url, self.max_pages, seed_response=gateway["response"]):
+                self._report("crawling", pages_fetched=self.stats["pages_fetched"] + 1)
+                if page["not_modified"]:
+                    unchanged_sources.add(page["url"])
+                    continue
+                if diagnostics["first_title"] is None and page.get("document") is not None:
+                    diagnostics["first_title"] = page["document"].title or ""
+                yield page
+
+        def extracted_pages(pool):
+            with closing(buffered(changed_pages(), name="crawl")) as pages:
+                for result in pool.process(pages):
+                    self.timings.append({"url": result["url"], "status": result["status"], "seconds": result["seconds"]})
+                    if result["text"]:
+                        self._report("extracting", pages_extracted=self.stats["pages_extracted"] + 1)
+                        yield result
+
+        def chunks(pool):
+            chunker = Chunker()
+            # Text arrives already cleaned from the extraction stage.
+            with closing(buffered(extracted_pages(pool), name="extract")) as results:
+                for data in results:
+                    text = boilerplate.filter(data['url'], data['text']) if boilerplate else data['text']
+                    if not text:
+                        continue
+                    page_chunks = chunker.chunk(text, data['url'], data['title'])
+                    self._report("chunking", chunks_count=self.stats["chunks_count"] + len(page_chunks))
+                    yield from page_chunks
+
+        vs_wrapper = VectorStore(collection_name=self.collection_name)
+        with ExtractionPool() as pool, closing(chunks(pool)) as chunk_stream:
+            vs_wrapper.create_collection(
+                chunk_stream, self.embedding_function,
+                progress=lambda written: self._report("embedding", vectors_written=written),
+                keep_sources=unchanged_sources
+            )
+        if boilerplate:
+            pages, stale = boilerplate.finish(unchanged_sources)
+            page_lines.replace(pages)
+            if boilerplate.lines_removed:
+                logger.info(f"Dropped {boilerplate.lines_removed} boilerplate lines")
+            if stale and fetch_cache is not None:
+                # Chunked before the site's boilerplate was known; refetch them so the next run fixes their chunks.
+                fetch_cache.forget(stale)
+        if self.timings:
+            slowest = max(self.timings, key=lambda t: t["seconds"])
+            logger.info(f"Extracted {self.stats['pages_extracted']}/{len(self.timings)} pages; slowest {slowest['url']} ({slowest['seconds']:.2f}s)")
+
+        if not self.stats["pages_fetched"]:
+            raise IndexingError('Could not crawl any pages from the URL. The website might be blocking bot access or the URL is invalid.')
+
+        if not self.stats["chunks_count"] and not unchanged_sources:
+            # Diagnostics: Check if extraction failed (Crawling success but no data)
+            if self.timings and not self.stats["pages_extracted"]:
+                # Provide hint about what was downloaded
+                page_title = diagnostics["first_title"] or "No Title Found"
+                raise IndexingError(f'Crawling worked ({len(self.timings)} pages) but extraction failed. The site might be blocking the bot. Page Title: "{page_title}"')
+
+            raise IndexingError('No text content could be extracted from the website. It might be empty or protected.')
+
+        if fetch_cache is not None:
+            if vs_wrapper.last_stats["reset"]:
+                fetch_cache.clear()
+            elif vs_wrapper.last_stats["missing_sources"]:
+                # Their validators point at vectors that are gone; refetch them next time.
+                fetch_cache.forget(vs_wrapper.last_stats["missing_sources"])
+        self._report("embedding", vectors_written=vs_wrapper.last_stats["added"])
+
+        logger.info(f"Indexed {url}: {self.stats}")
+        return {**self.stats, "chunks_total": vs_wrapper.last_stats["added"] + vs_wrapper.last_stats["unchanged"]}
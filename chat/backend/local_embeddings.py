@@ -0,0 +1,45 @@
+import logging
+import threading
+from typing import List
+from langchain_core.embeddings import Embeddings
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+_models = {}
+_models_lock = threading.Lock()
+
+def _load_model(model_name: str):
+    """Load the model once per process: quantized ONNX via fastembed if installed, else sentence-transformers on CPU."""
+    with _models_lock:
+        if model_name not in _models:
+            try:
+                from fastembed import TextEmbedding
+                _models[model_name] = ("fastembed", TextEmbedding(model_name=model_name))
+                logger.info(f"Loaded local ONNX embedding model {model_name} (fastembed)")
+            except ImportError:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise ImportError("EMBEDDING_PROVIDER=local requires 'fastembed' (recommended) or 'sentence-transformers'.")
+                _models[model_name] = ("sentence_transformers", SentenceTransformer(model_name, device="cpu"))
+                logger.info(f"Loaded local embedding model {model_name} (sentence-transformers)")
+        return _models[model_name]
+
+class LocalEmbeddings(Embeddings):
+    """Runs the embedding model in-process on CPU, loading it lazily on first use."""
+
+    def __init__(self, model_name: str, batch_size: int = Config.LOCAL_EMBEDDING_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        backend, model = _load_model(self.model_name)
+        if backend == "fastembed":
+            return [vector.tolist() for vector in model.embed(texts, batch_size=self.batch_size)]
+        return model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,395 @@
+import glob
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangChainVectorStore
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+_BLOCK_ROWS = 65536
+
+class LocalVectorIndex(LangChainVectorStore):
+    """On-disk vector index: a memory-mapped matrix of unit vectors plus a SQLite sidecar for chunk metadata.
+
+    Vectors are appended to `vectors-<generation>.bin` and read through np.memmap, so opening an
+    index is near-instant and gunicorn workers share the pages through the OS cache. Rows
+    removed by deletes or upserts stay in the file until `optimize()` compacts it. Search is a
+    blockwise brute-force dot product; collections above `hnsw_threshold` also get an HNSW graph
+    (when hnswlib is installed) covering the rows that existed when it was built.
+    """
+
+    def __init__(self, directory: str, embedding: Optional[Embeddings] = None,
+                 dtype: str = Config.LOCAL_INDEX_DTYPE,
+                 hnsw_threshold: int = Config.LOCAL_INDEX_HNSW_THRESHOLD):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.embedding = embedding
+        self.hnsw_threshold = hnsw_threshold
+        self._lock = threading.RLock()
+        # Autocommit mode: reads and writes open explicit transactions so a search never
+        # sees row numbers from one generation and vectors from another.
+        self._conn = sqlite3.connect(os.path.join(directory, "meta.sqlite3"), check_same_thread=False,
+                                     timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO info (key, value) VALUES ('dtype', ?)", (np.dtype(dtype).name,))
+        self._state = None
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    # -- storage helpers -------------------------------------------------------
+
+    def _info(self) -> dict:
+        info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+        return {
+            "dtype": np.dtype(info["dtype"]),
+            "dim": int(info.get("dim", 0)),
+            "rows": int(info.get("rows", 0)),
+            "generation": int(info.get("generation", 0)),
+            "version": int(info.get("version", 0)),
+            "hnsw_rows": int(info.get("hnsw_rows", 0)),
+        }
+
+    def _set_info(self, **values):
+        self._conn.executemany(
+            "INSERT INTO info (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(key, str(value)) for key, value in values.items()]
+        )
+
+    def _vectors_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors-{generation}.bin")
+
+    def _hnsw_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"hnsw-{generation}.bin")
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    # -- writes ----------------------------------------------------------------
+
+    def add_vectors(self, ids: List[str], vectors: List[List[float]], texts: List[str],
+                    metadatas: Optional[List[dict]] = None) -> List[str]:
+        """Append vectors with their chunk text and metadata; an existing ID is replaced."""
+        if not ids:
+            return []
+        matrix = self._normalize(vectors)
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                info = self._info()
+                dim = info["dim"] or matrix.shape[1]
+                if matrix.shape[1] != dim:
+                    raise ValueError(f"Vector dimension {matrix.shape[1]} does not match index dimension {dim}")
+                path = self._vectors_path(info["generation"])
+                row_bytes = dim * info["dtype"].itemsize
+                with open(path, "ab") as f:
+                    # Drop bytes left by a write whose metadata never committed.
+                    f.truncate(info["rows"] * row_bytes)
+                    f.write(matrix.astype(info["dtype"]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._delete_ids(ids)
+                self._conn.executemany(
+                    "INSERT INTO chunks (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                    [(info["rows"] + i, doc_id, text, json.dumps(metadata))
+                     for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))]
+                )
+                self._set_info(dim=dim, rows=info["rows"] + len(ids), version=info["version"] + 1)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return list(ids)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if self.embedding is None:
+            raise ValueError("LocalVectorIndex needs an embedding function to add texts.")
+        if ids is None and metadatas:
+            ids = [metadata.get("chunk_id") for metadata in metadatas]
+        if not ids or not all(ids):
+            raise ValueError("LocalVectorIndex needs an id (or chunk_id metadata) for every text.")
+        return self.add_vectors(ids, self.embedding.embed_documents(texts), texts, metadatas)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, directory: str = "", **kwargs: Any) -> "LocalVectorIndex":
+        index = cls(directory or Config.LOCAL_INDEX_PATH, embedding=embedding)
+        index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
+
+    def _delete_ids(self, ids: List[str]) -> int:
+        deleted = 0
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            deleted += self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch).rowcount
+        return deleted
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._delete_ids(list(ids))
+                if deleted:
+                    self._set_info(version=self._info()["version"] + 1)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def clear(self):
+        """Remove every vector and start a new, empty generation."""
+        self._rewrite(lambda info: [])
+
+    def destroy(self):
+        self._conn.close()
+        self._state = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _rewrite(self, live_rows):
+        """Write the rows returned by `live_rows(info)` into a new generation and renumber the metadata to match."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                info = self._info()
+                rows = live_rows(info)
+                generation = info["generation"] + 1
+                with open(self._vectors_path(generation), "wb") as f:
+                    if rows:
+                        source = self._open_matrix(info)
+                        for start in range(0, len(rows), _BLOCK_ROWS):
+                            f.write(np.ascontiguousarray(source[rows[start:start + _BLOCK_ROWS]]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                if rows:
+                    mapping = [(new_row, old_row) for new_row, old_row in enumerate(rows)]
+                    # Shift out of the way first so renumbering cannot collide with existing rows.
+                    offset = info["rows"] + 1
+                    self._conn.execute("UPDATE chunks SET row = row + ?", (offset,))
+                    self._conn.executemany("UPDATE chunks SET row = ? WHERE row = ?", [(new, old + offset) for new, old in mapping])
+                else:
+                    self._conn.execute("DELETE FROM chunks")
+                self._set_info(rows=len(rows), generation=generation, version=info["version"] + 1, hnsw_rows=0)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        # Keep the previous generation for readers still mapped onto it; older ones can go.
+        for path in glob.glob(os.path.join(self.directory, "vectors-*.bin")) + glob.glob(os.path.join(self.directory, "hnsw-*.bin")):
+            file_generation = int(os.path.basename(path).split("-")[1].split(".")[0])
+            if file_generation < generation - 1:
+                os.remove(path)
+
+    def optimize(self, compact_ratio: float = Config.LOCAL_INDEX_COMPACT_RATIO):
+        """Compact away dead rows when they make up more than `compact_ratio` of the file, then (re)build HNSW if warranted."""
+        with self._lock:
+            info = self._info()
+            live = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            if info["rows"] and (info["rows"] - live) / info["rows"] > compact_ratio:
+                logger.info(f"Compacting {self.directory}: {info['rows'] - live} dead of {info['rows']} rows")
+                self._rewrite(lambda info: [row for (row,) in self._conn.execute("SELECT row FROM chunks ORDER BY row")])
+                info = self._info()
+            if hnswlib is None or info["rows"] < self.hnsw_threshold or info["hnsw_rows"] == info["rows"]:
+                return
+            rows = np.array([row for (row,) in self._conn.execute("SELECT row FROM chunks ORDER BY row")], dtype=np.int64)
+
+        logger.info(f"Building HNSW graph over {len(rows)} vectors in {self.directory}")
+        matrix = self._open_matrix(info)
+        graph = hnswlib.Index(space="ip", dim=info["dim"])
+        graph.init_index(max_elements=max(1, len(rows)), ef_construction=Config.LOCAL_INDEX_HNSW_EF_CONSTRUCTION, M=Config.LOCAL_INDEX_HNSW_M)
+        for start in range(0, len(rows), _BLOCK_ROWS):
+            batch = rows[start:start + _BLOCK_ROWS]
+            graph.add_items(np.asarray(matrix[batch], dtype=np.float32), batch)
+        graph.save_index(self._hnsw_path(info["generation"]))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._info()
+                # A compaction in the meantime renumbered the rows; that graph is useless now.
+                if current["generation"] == info["generation"]:
+                    self._set_info(hnsw_rows=info["rows"], version=current["version"] + 1)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # -- reads -----------------------------------------------------------------
+
+    def _open_matrix(self, info: dict) -> np.ndarray:
+        if not info["rows"]:
+            return np.zeros((0, info["dim"] or 1), dtype=info["dtype"])
+        return np.memmap(self._vectors_path(info["generation"]), dtype=info["dtype"], mode="r", shape=(info["rows"], info["dim"]))
+
+    def _load_state(self, info: dict) -> dict:
+        """Reader view for one index version, cached until the next write."""
+        if self._state is not None and self._state["version"] == info["version"] and self._state["generation"] == info["generation"]:
+            return self._state
+        live = np.zeros(info["rows"], dtype=bool)
+        rows = np.fromiter((row for (row,) in self._conn.execute("SELECT row FROM chunks")), dtype=np.int64)
+        live[rows] = True
+        graph = None
+        if hnswlib is not None and info["hnsw_rows"]:
+            cached = self._state
+            if cached is not None and cached["graph"] is not None and cached["generation"] == info["generation"] \
+                    and cached["hnsw_rows"] == info["hnsw_rows"]:
+                graph = cached["graph"]
+            else:
+                graph = hnswlib.Index(space="ip", dim=info["dim"])
+                graph.load_index(self._hnsw_path(info["generation"]), max_elements=info["hnsw_rows"])
+        self._state = {
+            "version": info["version"],
+            "generation": info["generation"],
+            "matrix": self._open_matrix(info),
+            "live": live,
+            "count": len(rows),
+            "graph": graph,
+            "hnsw_rows": info["hnsw_rows"] if graph is not None else 0,
+        }
+        return self._state
+
+    @staticmethod
+    def _brute_force(matrix, live, query: np.ndarray, start: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows, scores = [], []
+        for block_start in range(start, matrix.shape[0], _BLOCK_ROWS):
+            block = np.asarray(matrix[block_start:block_start + _BLOCK_ROWS], dtype=np.float32)
+            block_scores = block @ query
+            block_scores[~live[block_start:block_start + len(block)]] = -np.inf
+            top = np.argpartition(-block_scores, min(k, len(block_scores)) - 1)[:k]
+            rows.append(top + block_start)
+            scores.append(block_scores[top])
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def _search_rows(self, state: dict, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        candidates_rows, candidates_scores = [], []
+        tail_start = 0
+        if state["graph"] is not None:
+            graph = state["graph"]
+            # Over-fetch so deleted rows filtered out below still leave k results.
+            fetch = min(state["hnsw_rows"], k + int((~state["live"][:state["hnsw_rows"]]).sum()))
+            graph.set_ef(max(Config.LOCAL_INDEX_HNSW_EF_SEARCH, fetch))
+            labels, distances = graph.knn_query(query, k=fetch)
+            labels = labels[0].astype(np.int64)
+            keep = state["live"][labels]
+            candidates_rows.append(labels[keep])
+            candidates_scores.append(1.0 - distances[0][keep])
+            tail_start = state["hnsw_rows"]
+        # Rows appended since the graph was built (or all rows, without one) are scanned exactly.
+        rows, scores = self._brute_force(state["matrix"], state["live"], query, tail_start, k)
+        candidates_rows.append(rows)
+        candidates_scores.append(scores)
+
+        rows = np.concatenate(candidates_rows)
+        scores = np.concatenate(candidates_scores)
+        order = np.argsort(-scores)
+        results = []
+        for i in order:
+            if np.isfinite(scores[i]):
+                results.append((int(rows[i]), float(scores[i])))
+            if len(results) == k:
+                break
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        query = self._normalize(embedding)[0]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                info = self._info()
+                if not info["rows"]:
+                    return []
+                if len(query) != info["dim"]:
+                    raise ValueError(f"Query dimension {len(query)} does not match index dimension {info['dim']}")
+                hits = self._search_rows(self._load_state(info), query, k)
+                if not hits:
+                    return []
+                placeholders = ",".join("?" * len(hits))
+                stored = {
+                    row: Document(page_content=text, metadata=json.loads(metadata))
+                    for row, text, metadata in self._conn.execute(
+                        f"SELECT row, text, metadata FROM chunks WHERE row IN ({placeholders})", [row for row, _ in hits]
+                    )
+                }
+            finally:
+                self._conn.execute("COMMIT")
+        return [(stored[row], score) for row, score in hits if row in stored]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        if self.embedding is None:
+            raise ValueError("LocalVectorIndex needs an embedding function to search by text.")
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities.
+        return lambda score: score
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return {doc_id for (doc_id,) in self._conn.execute("SELECT id FROM chunks")}
+
+    def get_documents(self, ids: List[str]) -> List[Document]:
+        documents = []
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                documents.extend(
+                    Document(page_content=text, metadata=json.loads(metadata))
+                    for text, metadata in self._conn.execute(f"SELECT text, metadata FROM chunks WHERE id IN ({placeholders})", batch)
+                )
+        return documents
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored (unit) vectors by chunk ID; IDs not in the index are left out."""
+        vectors = {}
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                info = self._info()
+                if not info["rows"]:
+                    return vectors
+                matrix = self._load_state(info)["matrix"]
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    for doc_id, row in self._conn.execute(f"SELECT id, row FROM chunks WHERE id IN ({placeholders})", batch):
+                        vectors[doc_id] = np.asarray(matrix[row], dtype=np.float32)
+            finally:
+                self._conn.execute("COMMIT")
+        return vectors
@@ -0,0 +1,181 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from chat.config import Config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = dict(self._values)
+        return [(f"{self.name}_total", dict(zip(self.labelnames, key)), value) for key, value in values.items()]
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = {key: ([*state[0]], state[1], state[2]) for key, state in self._values.items()}
+        samples = []
+        for key, (counts, total, count) in values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip([*self.buckets, float("inf")], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+class MetricsRegistry:
+    """Process-local counters and histograms rendered in the Prometheus text format.
+
+    Each gunicorn worker keeps its own values; every sample carries a `pid` label so series from
+    different workers stay separate when a scrape lands on either of them.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        pid = str(os.getpid())
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            kind = "counter" if isinstance(metric, Counter) else "histogram"
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for name, labels, value in metric.samples():
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in {**labels, "pid": pid}.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+metrics_registry = MetricsRegistry()
+
+STAGE_SECONDS = metrics_registry.histogram(
+    "webchat_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"])
+PAGES_FETCHED = metrics_registry.counter(
+    "webchat_pages_fetched", "Crawler fetches by outcome (ok, not_modified, failed).", ["status"])
+PAGES_EXTRACTED = metrics_registry.counter(
+    "webchat_pages_extracted", "Pages through extraction by outcome (ok, empty, timeout, error).", ["status"])
+CHUNKS = metrics_registry.counter("webchat_chunks", "Chunks produced by the chunker.")
+EMBEDDED_TEXTS = metrics_registry.counter(
+    "webchat_embedded_texts", "Texts sent to the embedding model (cache misses only).", ["kind"])
+EMBEDDING_CACHE = metrics_registry.counter(
+    "webchat_embedding_cache_lookups", "Embedding cache lookups by result.", ["result"])
+VECTORS_WRITTEN = metrics_registry.counter("webchat_vectors_written", "Vectors upserted into the vector store.", ["provider"])
+ANSWER_CACHE = metrics_registry.counter("webchat_answer_cache_lookups", "Answer cache lookups by result.", ["result"])
+LLM_TOKENS = metrics_registry.counter("webchat_llm_tokens", "LLM tokens by kind (prompt, completion).", ["kind"])
+
+# Stage timings of the current request, for the Server-Timing header; None outside a request.
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None)
+
+def observe_stage(stage: str, seconds: float):
+    if not Config.METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """Time the block into `webchat_stage_duration_seconds{stage=...}` and the request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+def inc(counter: Counter, amount: float = 1, **labels):
+    if Config.METRICS_ENABLED and amount:
+        counter.inc(amount, **labels)
+
+@contextmanager
+def collect_request_timings() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the stages timed while handling one request (threads and tasks inherit the list)."""
+    timings: List[Tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Server-Timing value with repeated stages summed, e.g. `embed;dur=3.1;desc="x2", llm;dur=812.0`."""
+    totals: Dict[str, List[float]] = {}
+    for stage, seconds in list(timings):
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for stage, (seconds, count) in totals.items():
+        part = f"{stage};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_CHARS = " \t\xa0\f\v\r\n"
+
+# One pass over the text, matching only whitespace runs that need rewriting: anything but a lone
+# space between words. A run containing line breaks becomes "\n" or one blank line, dropping the
+# spaces around them; any other run becomes a single space.
+_WHITESPACE_RUN = re.compile(f"(?: (?=[{_WHITESPACE_CHARS}])|[\t\xa0\f\v\r\n])[{_WHITESPACE_CHARS}]*")
+
+# Most runs are one of a handful of strings ("\n", "\n\n", "\xa0", "  "); remember their replacements.
+_replacements = {}
+
+def _collapse(run: str) -> str:
+    if "\n" not in run and "\r" not in run:
+        return " "
+    # "\r\n" is one break; a lone "\r" is one too.
+    breaks = run.count("\n") + run.count("\r") - run.count("\r\n")
+    return "\n\n" if breaks > 1 else "\n"
+
+def _replace(match: re.Match) -> str:
+    run = match.group()
+    replacement = _replacements.get(run)
+    if replacement is None:
+        replacement = _collapse(run)
+        if len(_replacements) < 1024:
+            _replacements[run] = replacement
+    return replacement
+
+def normalize(text: str) -> str:
+    """Unify line endings, collapse whitespace and NBSPs to single spaces and blank-line runs to one blank line, trim."""
+    if not text:
+        return ""
+    return _WHITESPACE_RUN.sub(_replace, text).strip()
+
+# Per page: hashes of its distinct lines, and the subset removed as boilerplate when it was last chunked.
+PageLines = Tuple[FrozenSet[int], FrozenSet[int]]
+
+def line_hash(line: str) -> int:
+    """Stable 64-bit hash of a line (the built-in hash() differs between processes)."""
+    return int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+class BoilerplateFilter:
+    """Drops lines repeated across pages of one site (navigation, footers, cookie notices).
+
+    A line is boilerplate when it appears on at least `min_pages` pages. Pages are filtered as they
+    arrive, against the line counts of the collection's previous run (`previous`, from
+    PageLinesCache) with the page's own old lines swapped for its new ones. A page's result thus
+    does not depend on crawl order, and an unchanged site gives identical chunks on every run.
+
+    On a first run there are no previous counts, so they build up as pages arrive and the first
+    pages keep their copies. `finish` reports such pages (any whose removed lines disagree with the
+    final counts) so they can be fetched again and fixed on the next run.
+    Expects normalised text (one line per paragraph or list item, blank lines between blocks).
+    """
+
+    def __init__(self, previous: Optional[Dict[str, PageLines]] = None, min_pages: int = Config.BOILERPLATE_MIN_PAGES):
+        self.min_pages = max(2, min_pages)
+        self.previous = previous or {}
+        self._counts = Counter(h for lines, _ in self.previous.values() for h in lines)
+        self._online = not self.previous
+        self._pages: Dict[str, PageLines] = {}
+        self._lock = threading.Lock()
+        self.lines_removed = 0
+
+    def filter(self, url: str, text: str) -> str:
+        if not text:
+            return text
+        lines = text.split("\n")
+        hashes = [line_hash(line) if line else None for line in lines]
+        page = frozenset(h for h in hashes if h is not None)
+        with self._lock:
+            if self._online:
+                self._counts.update(page)
+                removed = frozenset(h for h in page if self._counts[h] >= self.min_pages)
+            else:
+                old = self.previous.get(url, (frozenset(), frozenset()))[0]
+                removed = frozenset(h for h in page if self._counts[h] - (h in old) + 1 >= self.min_pages)
+            self._pages[url] = (page, removed)
+            if removed:
+                self.lines_removed += sum(h in removed for h in hashes)
+        if not removed:
+            return text
+        # Removed lines can leave blank lines next to each other; collapse them again.
+        return normalize("\n".join(line for line, h in zip(lines, hashes) if h not in removed))
+
+    def finish(self, unchanged: Iterable[str]) -> Tuple[Dict[str, PageLines], List[str]]:
+        """Line sets to store for the next run, and the pages to fetch again because their chunks disagree with them.
+
+        `unchanged` are the pages not re-extracted this run (304s); they keep their stored lines.
+        """
+        pages = {}
+        stale = []
+        for url in unchanged:
+            if url in self.previous:
+                pages[url] = self.previous[url]
+            else:
+                # Chunked before its lines were recorded (filter newly enabled); it can't be counted yet.
+                stale.append(url)
+        pages.update(self._pages)
+        counts = Counter(h for lines, _ in pages.values() for h in lines)
+        for url, (lines, removed) in pages.items():
+            if frozenset(h for h in lines if counts[h] >= self.min_pages) != removed:
+                stale.append(url)
+        return pages, stale
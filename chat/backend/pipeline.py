@@ -0,0 +1,64 @@
+import logging
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def buffered(iterable: Iterable[T], maxsize: int = Config.PIPELINE_QUEUE_DEPTH, name: str = "stage") -> Iterator[T]:
+    """Run `iterable` on its own thread and yield its items through a bounded queue.
+
+    Chaining stages with this keeps at most `maxsize` items between any two of them, so
+    memory is bounded by queue depth rather than by input size, while every stage works
+    concurrently. Exceptions raised by the producer are re-raised in the consumer, and
+    closing the consumer stops (and closes) the producer.
+    """
+    items: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join(timeout=5)
+        if thread.is_alive():
+            logger.warning(f"Pipeline stage '{name}' did not stop within 5s")
@@ -0,0 +1,136 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Union
+from langchain_core.documents import Document
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def _load_encoding(name: str):
+    """tiktoken encoding, loaded once per process; None if tiktoken or its BPE file is unavailable."""
+    with _encodings_lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                # get_encoding downloads the BPE file on first use; offline hosts fall back to estimates.
+                logger.warning(f"tiktoken encoding '{name}' unavailable, estimating tokens from characters: {e}")
+                _encodings[name] = None
+        return _encodings[name]
+
+class TokenCounter:
+    """Counts and truncates text in tokens, approximating with ~4 characters per token without tiktoken."""
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding_name: str = Config.PROMPT_TOKENIZER):
+        self.encoding = _load_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is None:
+            return -(-len(text) // self.CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is None:
+            return text[:max_tokens * self.CHARS_PER_TOKEN]
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+
+class PromptAssembler:
+    """Fits question, chat history and retrieved context into a fixed token budget.
+
+    Priority: the question is always kept (capped at `question_tokens`), then context gets
+    everything not claimed by history, and history (newest first, capped at `history_tokens`)
+    gives way whenever context would drop below `min_context_tokens`. Documents are taken in
+    retrieval order; the first one that does not fit is cut short, the rest are dropped. An
+    older message that does not fit in full is reduced to its opening and everything before it is dropped.
+    """
+
+    TRUNCATION_MARK = " [...]"
+    ROLE_LABELS = {"user": "Human", "assistant": "AI"}
+
+    def __init__(self, template: str,
+                 budget: int = Config.PROMPT_TOKEN_BUDGET,
+                 history_tokens: int = Config.PROMPT_HISTORY_TOKENS,
+                 question_tokens: int = Config.PROMPT_QUESTION_TOKENS,
+                 min_context_tokens: int = Config.PROMPT_MIN_CONTEXT_TOKENS,
+                 counter: Optional[TokenCounter] = None):
+        self.counter = counter or TokenCounter()
+        self.budget = budget
+        self.history_tokens = history_tokens
+        self.question_tokens = question_tokens
+        self.min_context_tokens = min_context_tokens
+        self.template_tokens = self.counter.count(template.format(context="", chat_history="", question=""))
+
+    def _fit_history(self, messages: Union[str, Sequence[Dict]], budget: int) -> List[str]:
+        if isinstance(messages, str):
+            # Pre-formatted history: keep its most recent lines.
+            messages = [{"role": None, "content": line} for line in messages.splitlines() if line.strip()]
+        lines = []
+        remaining = budget
+        for message in reversed(messages):
+            label = self.ROLE_LABELS.get(message.get("role"))
+            line = f"{label}: {message['content']}" if label else message["content"]
+            cost = self.counter.count(line) + 1
+            if cost <= remaining:
+                lines.append(line)
+                remaining -= cost
+                continue
+            # Keep the opening of the message that overflows if there is room for something useful, then stop.
+            if remaining > 20:
+                lines.append(self.counter.truncate(line, remaining - 1 - self.counter.count(self.TRUNCATION_MARK)) + self.TRUNCATION_MARK)
+            break
+        return list(reversed(lines))
+
+    def assemble(self, question: str, documents: List[Document],
+                 history: Union[str, Sequence[Dict]] = ()) -> Dict:
+        """Return {"context", "chat_history", "question", "documents" (those used), "usage" (token counts)}."""
+        question_text = question
+        if self.counter.count(question) > self.question_tokens:
+            question_text = self.counter.truncate(question, self.question_tokens) + self.TRUNCATION_MARK
+        question_count = self.counter.count(question_text)
+
+        available = max(0, self.budget - self.template_tokens - question_count)
+        history_lines = self._fit_history(history or (), min(self.history_tokens, max(0, available - self.min_context_tokens)))
+        chat_history = "\n".join(history_lines)
+        history_count = self.counter.count(chat_history)
+
+        context_budget = available - history_count
+        parts, used, truncated = [], [], 0
+        separator_tokens = self.counter.count("\n\n")
+        for doc in documents:
+            cost = self.counter.count(doc.page_content) + (separator_tokens if parts else 0)
+            if cost <= context_budget:
+                parts.append(doc.page_content)
+                used.append(doc)
+                context_budget -= cost
+                continue
+            if context_budget > 50:
+                parts.append(self.counter.truncate(doc.page_content, context_budget - separator_tokens - self.counter.count(self.TRUNCATION_MARK)) + self.TRUNCATION_MARK)
+                used.append(doc)
+                truncated += 1
+            break
+        context = "\n\n".join(parts)
+
+        usage = {
+            "template_tokens": self.template_tokens,
+            "question_tokens": question_count,
+            "history_tokens": history_count,
+            "context_tokens": self.counter.count(context),
+            "documents_used": len(used),
+            "documents_dropped": len(documents) - len(used),
+            "documents_truncated": truncated,
+            "history_messages": len(history_lines),
+        }
+        usage["prompt_tokens"] = usage["template_tokens"] + question_count + history_count + usage["context_tokens"]
+        logger.info(f"Prompt assembled: {usage}")
+        return {"context": context, "chat_history": chat_history, "question": question_text, "documents": used, "usage": usage}
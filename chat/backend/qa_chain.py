@@ -1,21 +1,33 @@
+import asyncio
+import time
+from chat.backend import metrics
+
 class QAChain:
     
-    def __init__(self, vectorstore_retriever):
+    def __init__(self, vectorstore_retriever, answer_cache=None, cache_namespace=None, embedding_function=None, reranker=None, llm=None):
         import logging
-        from langchain_groq import ChatGroq
         from langchain_core.prompts import PromptTemplate
         from langchain_core.output_parsers import StrOutputParser
         from langchain_core.runnables import RunnablePassthrough
         from chat.config import Config
+        from chat.backend.prompt_budget import PromptAssembler
         
         self.logger = logging.getLogger(__name__)
         self.retriever = vectorstore_retriever
+        self.answer_cache = answer_cache
+        self.cache_namespace = cache_namespace
+        self.embedding_function = embedding_function
+        self.reranker = reranker
         
-        self.llm = ChatGroq(
-            model_name=Config.LLM_MODEL_NAME,
-            temperature=Config.LLM_TEMPERATURE,
-            groq_api_key=Config.GROQ_API_KEY
-        )
+        # Any LangChain LLM or chat model; benchmarks pass a fake one.
+        if llm is None:
+            from langchain_groq import ChatGroq
+            llm = ChatGroq(
+                model_name=Config.LLM_MODEL_NAME,
+                temperature=Config.LLM_TEMPERATURE,
+                groq_api_key=Config.GROQ_API_KEY
+            )
+        self.llm = llm
         
         template = """Use the following pieces of context to answer the question at the end. 
 If you don't know the answer, just say 'The answer is not available on the provided website.', don't try to make up an answer.
@@ -34,16 +46,72 @@ Answer:"""
             input_variables=["context", "chat_history", "question"]
         )
         
+        self.assembler = PromptAssembler(template)
+        
         # Build chain using LCEL
         self.chain = self.prompt | self.llm | StrOutputParser()
     
-    def answer(self, query: str, chat_history: str = ""):
+    async def _akeyword_shortcut(self, query: str):
+        """Documents for a decisive exact-term match, found without embedding the query; else None."""
+        shortcut = getattr(self.retriever, 'keyword_shortcut', None)
+        if shortcut is None:
+            return None
+        return await asyncio.to_thread(shortcut, query) or None
+
+    async def _aretrieve(self, query: str, query_vector=None):
+        if hasattr(self.retriever, 'aretrieve'):
+            # The shortcut was already tried; reuse the answer-cache embedding for the vector search.
+            top_k = self.reranker.fetch_k if self.reranker is not None else None
+            with metrics.timer("retrieve"):
+                docs = await self.retriever.aretrieve(query, top_k=top_k, query_vector=query_vector, shortcut=False)
+        elif hasattr(self.retriever, 'ainvoke'):
+            with metrics.timer("retrieve"):
+                docs = await self.retriever.ainvoke(query)
+        else:
+            with metrics.timer("retrieve"):
+                docs = await asyncio.to_thread(self.retriever.get_relevant_documents, query)
+        if self.reranker is not None:
+            with metrics.timer("rerank"):
+                docs = await self.reranker.arerank(query, docs, query_vector=query_vector)
+        return docs
+
+    async def _acache_lookup(self, query: str, chat_history, embed: bool = True):
+        """Return (cached result or None, query vector for a later put)."""
+        if self.answer_cache is None:
+            return None, None
+        query_vector = None
+        if embed and self.embedding_function is not None and self.answer_cache.similarity_threshold is not None:
+            try:
+                query_vector = await self.embedding_function.aembed_query(query)
+            except Exception as e:
+                self.logger.warning(f"Could not embed query for answer cache: {e}")
+        cached = self.answer_cache.get(self.cache_namespace, query, query_vector, chat_history=chat_history)
+        metrics.inc(metrics.ANSWER_CACHE, result="hit" if cached is not None else "miss")
+        return cached, query_vector
+
+    def _record_tokens(self, usage, answer_text: str):
+        metrics.inc(metrics.LLM_TOKENS, usage["prompt_tokens"], kind="prompt")
+        metrics.inc(metrics.LLM_TOKENS, self.assembler.counter.count(answer_text), kind="completion")
+
+    def _cache_store(self, query: str, chat_history, result, query_vector):
+        if self.answer_cache is not None and result["sources"]:
+            self.answer_cache.put(self.cache_namespace, query, result, query_vector, chat_history=chat_history)
+
+    async def aanswer(self, query: str, chat_history=""):
+        """`chat_history` is a list of {"role", "content"} messages (oldest first) or a pre-formatted string.
+
+        The LLM call uses the chain's native async client, so waiting on Groq holds no thread.
+        """
         self.logger.info(f"Generating answer for query: {query}")
         try:
-            if hasattr(self.retriever, 'invoke'):
-                docs = self.retriever.invoke(query)
-            else:
-                docs = self.retriever.get_relevant_documents(query)
+            docs = await self._akeyword_shortcut(query)
+            cached, query_vector = await self._acache_lookup(query, chat_history, embed=docs is None)
+            if cached is not None:
+                self.logger.info(f"Answer cache hit for query: {query}")
+                return cached
+            
+            if docs is None:
+                docs = await self._aretrieve(query, query_vector)
             
             if not docs:
                 self.logger.warning(f"No relevant documents found for: {query}")
@@ -52,20 +120,22 @@ Answer:"""
                     "sources": []
                 }
             
-            # Format context from documents
-            context = "\n\n".join([doc.page_content for doc in docs])
+            prompt = self.assembler.assemble(query, docs, chat_history)
+            with metrics.timer("llm"):
+                answer_text = await self.chain.ainvoke({
+                    "context": prompt["context"],
+                    "chat_history": prompt["chat_history"],
+                    "question": prompt["question"]
+                })
+            self._record_tokens(prompt["usage"], answer_text)
             
-            # Invoke chain with formatted inputs
-            answer_text = self.chain.invoke({
-                "context": context,
-                "chat_history": chat_history,
-                "question": query
-            })
-            
-            return {
+            result = {
                 "answer": answer_text,
-                "sources": docs
+                "sources": prompt["documents"],
+                "usage": prompt["usage"]
             }
+            self._cache_store(query, chat_history, result, query_vector)
+            return result
             
         except Exception as e:
             self.logger.error(f"Error executing QA chain: {e}", exc_info=True)
@@ -73,3 +143,51 @@ Answer:"""
                 "answer": f"An error occurred: {str(e)}",
                 "sources": []
             }
+
+    async def astream_answer(self, query: str, chat_history=""):
+        """Yield a 'sources' event, then 'token' events as the LLM produces them, then 'done' (with token usage)."""
+        self.logger.info(f"Streaming answer for query: {query}")
+        answer_parts = []
+        usage = None
+        try:
+            docs = await self._akeyword_shortcut(query)
+            cached, query_vector = await self._acache_lookup(query, chat_history, embed=docs is None)
+            if cached is not None:
+                self.logger.info(f"Answer cache hit for query: {query}")
+                yield {"type": "sources", "sources": cached["sources"]}
+                yield {"type": "token", "text": cached["answer"]}
+                yield {"type": "done", "answer": cached["answer"], "usage": cached.get("usage")}
+                return
+            
+            if docs is None:
+                docs = await self._aretrieve(query, query_vector)
+            prompt = self.assembler.assemble(query, docs, chat_history) if docs else None
+            yield {"type": "sources", "sources": prompt["documents"] if prompt else docs}
+            
+            if not docs:
+                self.logger.warning(f"No relevant documents found for: {query}")
+                answer_parts.append("The answer is not available on the provided website.")
+                yield {"type": "token", "text": answer_parts[0]}
+            else:
+                usage = prompt["usage"]
+                started = time.perf_counter()
+                async for token in self.chain.astream({
+                    "context": prompt["context"],
+                    "chat_history": prompt["chat_history"],
+                    "question": prompt["question"]
+                }):
+                    if not answer_parts:
+                        metrics.observe_stage("llm_first_token", time.perf_counter() - started)
+                    answer_parts.append(token)
+                    yield {"type": "token", "text": token}
+                metrics.observe_stage("llm", time.perf_counter() - started)
+                self._record_tokens(usage, "".join(answer_parts))
+                self._cache_store(query, chat_history, {"answer": "".join(answer_parts), "sources": prompt["documents"], "usage": usage}, query_vector)
+                    
+        except Exception as e:
+            self.logger.error(f"Error streaming QA chain: {e}", exc_info=True)
+            error_text = f"An error occurred: {str(e)}"
+            answer_parts.append(error_text)
+            yield {"type": "error", "text": error_text}
+            
+        yield {"type": "done", "answer": "".join(answer_parts), "usage": usage}
@@ -0,0 +1,86 @@
+import logging
+import threading
+from typing import Hashable
+from chat.backend.embedder import Embedder
+from chat.backend.answer_cache import AnswerCache
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+class ClientRegistry:
+    """Per-process cache of the embedding function, vector store handles and QA chains.
+
+    The vector store and chain modules are imported on first use so that importing the views
+    (and booting a worker) does not pay for the provider SDKs and LangChain runnables.
+
+    Callers pass a collection `version` from shared state (when it was last indexed). A worker that
+    did not run the re-index sees a new version on its next request, reopens the collection and
+    stops serving answers cached for the old one.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embedding_function = None
+        self._vectorstores = {}
+        self._qa_chains = {}
+        self._versions = {}
+        self._llm = None
+        self.answer_cache = AnswerCache() if Config.ANSWER_CACHE_ENABLED else None
+
+    def configure(self, embedding_function=None, llm=None):
+        """Replace the embedding function and LLM (benchmarks, offline runs) and drop handles built with the old ones."""
+        with self._lock:
+            self._embedding_function = embedding_function
+            self._llm = llm
+            self._vectorstores.clear()
+            self._qa_chains.clear()
+
+    def get_embedding_function(self):
+        with self._lock:
+            if self._embedding_function is None:
+                self._embedding_function = Embedder().get_embedding_function()
+            return self._embedding_function
+
+    def get_vectorstore(self, collection_name: str = "website_content"):
+        with self._lock:
+            if collection_name not in self._vectorstores:
+                from chat.backend.vectorstore import VectorStore
+                logger.info(f"Opening vector store handle for '{collection_name}'")
+                vs_wrapper = VectorStore(collection_name=collection_name)
+                vectorstore = vs_wrapper.load_collection(self.get_embedding_function())
+                self._vectorstores[collection_name] = (vs_wrapper, vectorstore)
+            return self._vectorstores[collection_name]
+
+    def get_qa_chain(self, collection_name: str = "website_content", version: Hashable = None):
+        with self._lock:
+            if collection_name in self._qa_chains and self._versions.get(collection_name) != version:
+                self._drop(collection_name)
+            self._versions[collection_name] = version
+            if collection_name not in self._qa_chains:
+                from chat.backend.qa_chain import QAChain
+                from chat.backend.reranker import Reranker
+                vs_wrapper, vectorstore = self.get_vectorstore(collection_name)
+                self._qa_chains[collection_name] = QAChain(
+                    vs_wrapper.as_retriever(vectorstore),
+                    answer_cache=self.answer_cache,
+                    cache_namespace=(collection_name, self._versions.get(collection_name)),
+                    embedding_function=self.get_embedding_function(),
+                    reranker=Reranker(vs_wrapper.stored_vectors) if Config.RERANK_ENABLED else None,
+                    llm=self._llm
+                )
+            return self._qa_chains[collection_name]
+
+    def _drop(self, collection_name: str):
+        self._vectorstores.pop(collection_name, None)
+        self._qa_chains.pop(collection_name, None)
+        if self.answer_cache is not None:
+            self.answer_cache.drop(collection_name)
+        logger.info(f"Invalidated cached clients for '{collection_name}'")
+
+    def invalidate(self, collection_name: str = "website_content"):
+        """Drop cached handles for a collection after it has been rebuilt or deleted (in this process)."""
+        with self._lock:
+            self._drop(collection_name)
+            self._versions.pop(collection_name, None)
+
+registry = ClientRegistry()
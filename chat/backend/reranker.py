@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.documents import Document
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+_cross_encoders = {}
+_cross_encoders_lock = threading.Lock()
+
+def _load_cross_encoder(model_name: str):
+    """Load the cross-encoder once per process: fastembed (ONNX) if installed, else sentence-transformers on CPU."""
+    with _cross_encoders_lock:
+        if model_name not in _cross_encoders:
+            try:
+                from fastembed.rerank.cross_encoder import TextCrossEncoder
+                _cross_encoders[model_name] = ("fastembed", TextCrossEncoder(model_name=model_name))
+                logger.info(f"Loaded cross-encoder {model_name} (fastembed)")
+            except ImportError:
+                try:
+                    from sentence_transformers import CrossEncoder
+                except ImportError:
+                    raise ImportError("RERANK_CROSS_ENCODER_MODEL requires 'fastembed' (recommended) or 'sentence-transformers'.")
+                _cross_encoders[model_name] = ("sentence_transformers", CrossEncoder(model_name, device="cpu"))
+                logger.info(f"Loaded cross-encoder {model_name} (sentence-transformers)")
+        return _cross_encoders[model_name]
+
+def _unit_rows(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class Reranker:
+    """Picks the final context chunks from an over-fetched candidate list.
+
+    Maximal marginal relevance over the chunk vectors drops near-duplicates (overlapping chunks of
+    the same page) in favour of diverse ones; an optional cross-encoder then re-scores the survivors
+    against the query. Chunk vectors are the ones stored at index time, read back by chunk ID through
+    `vector_lookup`; when any is unavailable MMR is skipped rather than re-embedding the candidates.
+    """
+
+    def __init__(self, vector_lookup: Optional[Callable[[List[str]], Dict[str, Sequence[float]]]] = None,
+                 top_k: int = Config.RETRIEVAL_TOP_K,
+                 fetch_multiplier: int = Config.RERANK_FETCH_MULTIPLIER,
+                 mmr_lambda: float = Config.RERANK_MMR_LAMBDA,
+                 duplicate_threshold: float = Config.RERANK_DUPLICATE_THRESHOLD,
+                 cross_encoder_model: Optional[str] = Config.RERANK_CROSS_ENCODER_MODEL):
+        self.vector_lookup = vector_lookup
+        self.top_k = top_k
+        self.fetch_k = top_k * max(1, fetch_multiplier)
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.cross_encoder_model = cross_encoder_model or None
+
+    def _mmr(self, query_vector, doc_vectors: np.ndarray, k: int) -> List[int]:
+        if query_vector is not None:
+            relevance = doc_vectors @ _unit_rows(query_vector)[0]
+        else:
+            # No query vector: trust the retriever's order for relevance.
+            relevance = 1.0 - np.arange(len(doc_vectors), dtype=np.float32) / len(doc_vectors)
+        similarity = doc_vectors @ doc_vectors.T
+
+        selected = []
+        remaining = list(range(len(doc_vectors)))
+        while remaining and len(selected) < k:
+            if selected:
+                redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype=np.float32)
+            scores = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+            best = remaining.pop(int(np.argmax(scores)))
+            selected.append(best)
+            if self.duplicate_threshold is not None:
+                remaining = [i for i in remaining if similarity[i, best] < self.duplicate_threshold]
+        return selected
+
+    def _stored_vectors(self, documents: List[Document]) -> Optional[np.ndarray]:
+        if self.vector_lookup is None:
+            return None
+        ids = [doc.metadata.get("chunk_id") for doc in documents]
+        if not all(ids):
+            return None
+        stored = self.vector_lookup(ids)
+        if any(doc_id not in stored for doc_id in ids):
+            return None
+        return _unit_rows([stored[doc_id] for doc_id in ids])
+
+    def _cross_encode(self, query: str, documents: List[Document]) -> List[float]:
+        backend, model = _load_cross_encoder(self.cross_encoder_model)
+        texts = [doc.page_content for doc in documents]
+        if backend == "fastembed":
+            return list(model.rerank(query, texts))
+        return model.predict([(query, text) for text in texts]).tolist()
+
+    def rerank(self, query: str, documents: List[Document], query_vector: Optional[List[float]] = None,
+               k: Optional[int] = None) -> List[Document]:
+        k = k or self.top_k
+        if len(documents) <= 1:
+            return documents[:k]
+
+        # With a cross-encoder to order them, keep a wider diverse pool for it to choose from.
+        pool_size = k * 2 if self.cross_encoder_model else k
+        try:
+            doc_vectors = self._stored_vectors(documents)
+        except Exception as e:
+            logger.warning(f"MMR re-ranking skipped: {e}")
+            doc_vectors = None
+        if doc_vectors is not None:
+            pool = self._mmr(query_vector, doc_vectors, pool_size)
+        else:
+            logger.info("Stored chunk vectors unavailable; keeping retriever order")
+            pool = list(range(len(documents)))
+        candidates = [documents[i] for i in pool]
+
+        if self.cross_encoder_model and len(candidates) > 1:
+            try:
+                scores = self._cross_encode(query, candidates)
+                order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+                candidates = [candidates[i] for i in order]
+            except Exception as e:
+                logger.warning(f"Cross-encoder re-ranking skipped: {e}")
+
+        logger.info(f"Re-ranked {len(documents)} candidates down to {min(k, len(candidates))}")
+        return candidates[:k]
+
+    async def arerank(self, query: str, documents: List[Document], query_vector: Optional[List[float]] = None,
+                      k: Optional[int] = None) -> List[Document]:
+        # Vector lookups and the cross-encoder are blocking; keep them off the event loop.
+        return await asyncio.to_thread(self.rerank, query, documents, query_vector, k)
@@ -1,13 +1,114 @@
+import asyncio
 import logging
-from typing import List
+from typing import Dict, List, Optional
+from langchain_core.documents import Document
+from chat.config import Config
+from chat.backend.bm25 import is_exact_term, tokenize
+from chat.backend import metrics
 
 logger = logging.getLogger(__name__)
 
 class Retriever:
-    
-    def retrieve(self, query: str, top_k: int = 3) -> List[str]:
+    """Hybrid retrieval: BM25 keyword hits fused with vector search by reciprocal rank fusion.
+
+    Queries naming a code, version or identifier are answered from the keyword index alone,
+    with no embedding round trip, when the keyword scores are decisive.
+    """
+
+    def __init__(self, vectorstore, keyword_index=None,
+                 top_k: int = Config.RETRIEVAL_TOP_K,
+                 fetch_k: int = Config.HYBRID_FETCH_K,
+                 rrf_k: int = Config.RRF_K,
+                 shortcut_ratio: float = Config.KEYWORD_SHORTCUT_RATIO):
+        self.vectorstore = vectorstore
+        self.keyword_index = keyword_index
+        self.top_k = top_k
+        self.fetch_k = max(fetch_k, top_k)
+        self.rrf_k = rrf_k
+        self.shortcut_ratio = shortcut_ratio
+
+    def keyword_shortcut(self, query: str) -> Optional[List[Document]]:
+        """Keyword-only results for an exact-term query whose best hit clearly wins, else None."""
+        if self.keyword_index is None:
+            return None
+        exact_terms = {term for term in tokenize(query) if is_exact_term(term)}
+        if not exact_terms:
+            return None
+
+        with metrics.timer("keyword_search"):
+            hits = self.keyword_index.search(query, self.top_k + 1)
+        if not hits or not exact_terms <= hits[0]["matched"]:
+            return None
+        if len(hits) > self.top_k and hits[0]["score"] < self.shortcut_ratio * hits[self.top_k]["score"]:
+            return None
+        logger.info(f"Keyword shortcut for exact-term query: {query}")
+        return [hit["document"] for hit in hits[:self.top_k] if exact_terms <= hit["matched"]]
+
+    def _vector_search(self, query: str, query_vector: Optional[List[float]]) -> List[Document]:
+        with metrics.timer("vector_search"):
+            if query_vector is not None:
+                return self.vectorstore.similarity_search_by_vector(query_vector, k=self.fetch_k)
+            return self.vectorstore.similarity_search(query, k=self.fetch_k)
+
+    async def _avector_search(self, query: str, query_vector: Optional[List[float]]) -> List[Document]:
+        with metrics.timer("vector_search"):
+            if query_vector is not None:
+                return await self.vectorstore.asimilarity_search_by_vector(query_vector, k=self.fetch_k)
+            return await self.vectorstore.asimilarity_search(query, k=self.fetch_k)
+
+    def _fuse(self, vector_docs: List[Document], keyword_docs: List[Document], top_k: int) -> List[Document]:
+        if not keyword_docs:
+            return vector_docs[:top_k]
+        # Reciprocal rank fusion: rank positions, not raw scores, so BM25 and cosine scales never need reconciling.
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for ranking in (vector_docs, keyword_docs):
+            for rank, doc in enumerate(ranking):
+                key = doc.metadata.get("chunk_id") or doc.page_content
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                documents.setdefault(key, doc)
+        return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)[:top_k]]
+
+    def _keyword_docs(self, query: str) -> List[Document]:
+        if self.keyword_index is None:
+            return []
+        with metrics.timer("keyword_search"):
+            return [hit["document"] for hit in self.keyword_index.search(query, self.fetch_k)]
+
+    def retrieve(self, query: str, top_k: Optional[int] = None, query_vector: Optional[List[float]] = None,
+                 shortcut: bool = True) -> List[Document]:
         if not query:
             return []
-            
+        top_k = top_k or self.top_k
+
         logger.info(f"Retrieving top {top_k} results for query: {query}")
-        return []
+        if shortcut:
+            documents = self.keyword_shortcut(query)
+            if documents:
+                return documents[:top_k]
+        return self._fuse(self._vector_search(query, query_vector), self._keyword_docs(query), top_k)
+
+    async def aretrieve(self, query: str, top_k: Optional[int] = None, query_vector: Optional[List[float]] = None,
+                        shortcut: bool = True) -> List[Document]:
+        """Async `retrieve`: keyword (SQLite) and vector searches run concurrently without blocking the event loop."""
+        if not query:
+            return []
+        top_k = top_k or self.top_k
+
+        logger.info(f"Retrieving top {top_k} results for query: {query}")
+        if shortcut:
+            documents = await asyncio.to_thread(self.keyword_shortcut, query)
+            if documents:
+                return documents[:top_k]
+        vector_docs, keyword_docs = await asyncio.gather(
+            self._avector_search(query, query_vector), asyncio.to_thread(self._keyword_docs, query))
+        return self._fuse(vector_docs, keyword_docs, top_k)
+
+    def invoke(self, query: str) -> List[Document]:
+        return self.retrieve(query)
+
+    async def ainvoke(self, query: str) -> List[Document]:
+        return await self.aretrieve(query)
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        return self.retrieve(query)
@@ -1,4 +1,5 @@
 import logging
+from typing import Dict, Optional
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -6,7 +7,12 @@ logger = logging.getLogger(__name__)
 class Validator:
     
     @staticmethod
-    def validate_gateway(url: str) -> dict:
+    def validate_gateway(url: str, headers: Optional[Dict[str, str]] = None) -> dict:
+        """Check that `url` answers with HTML and return the response for the crawler to reuse.
+
+        `headers` may carry conditional request headers (If-None-Match / If-Modified-Since) from
+        the fetch cache; a 304 then counts as valid and the returned response is that 304.
+        """
         if not url:
             return {"valid": False, "error": "URL cannot be empty."}
             
@@ -19,10 +25,14 @@ class Validator:
 
         try:
             from chat.config import Config
+            from chat.backend.http_client import get_session
             import requests
 
-            headers = {"User-Agent": Config.USER_AGENT}
-            response = requests.get(url, timeout=Config.REQUEST_TIMEOUT, headers=headers)
+            response = get_session().get(url, timeout=Config.REQUEST_TIMEOUT, headers=headers)
+            
+            if response.status_code == 304 and headers:
+                # Unchanged since the last crawl; the crawler reuses the cached page.
+                return {"valid": True, "error": None, "response": response}
             
             if response.status_code != 200:
                 return {
@@ -38,7 +48,8 @@ class Validator:
                     "error": f"URL does not point to a website (Content-Type: {content_type}). Expecting text/html."
                 }
                 
-            return {"valid": True, "error": None}
+            # Hand the downloaded page to the crawler so the start URL is not fetched twice.
+            return {"valid": True, "error": None, "response": response}
 
         except requests.Timeout:
             return {"valid": False, "error": f"Connection timed out (Limit: {Config.REQUEST_TIMEOUT}s)."}
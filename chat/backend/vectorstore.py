@@ -1,24 +1,32 @@
 import logging
-import chromadb
 import os
-from typing import List
-from langchain_community.vectorstores import Chroma
-from langchain_pinecone import PineconeVectorStore
+from typing import Callable, Dict, Iterable, List, Optional, Set
 from langchain_core.documents import Document
-from pinecone import Pinecone
 from chat.config import Config
+from chat.backend.embedding_pipeline import EmbeddingPipeline
+from chat.backend.hashing import content_hash
+from chat.backend.bm25 import BM25Index
+from chat.backend.retriever import Retriever
+from chat.backend import metrics
 
 logger = logging.getLogger(__name__)
 
 class VectorStore:
     
+    WRITE_BATCH_SIZE = 1000
+    
     def __init__(self, collection_name: str = "website_content"):
         os.environ["ANONYMIZED_TELEMETRY"] = "False"
         
         self.collection_name = collection_name
         self.provider = Config.VECTOR_STORE_PROVIDER
+        self.last_stats = {"added": 0, "unchanged": 0, "deleted": 0, "reset": False, "missing_sources": []}
+        self._index = None
+        self._keyword_index = None
         
+        # Provider clients are imported on demand: chromadb alone costs seconds of startup.
         if self.provider == "chroma":
+            import chromadb
             self.persist_directory = Config.CHROMA_DB_PATH
             try:
                 self.client = chromadb.PersistentClient(path=self.persist_directory)
@@ -27,9 +35,94 @@ class VectorStore:
                 raise e
         elif self.provider == "pinecone":
             self.index_name = Config.PINECONE_INDEX_NAME
+            # Each collection lives in its own namespace of the shared index.
+            self.namespace = collection_name
             if not Config.PINECONE_API_KEY:
                 raise ValueError("Pinecone API Key is missing.")
+        elif self.provider == "local":
+            self.index_path = os.path.join(Config.LOCAL_INDEX_PATH, collection_name)
     
+    def _pinecone_index(self):
+        if self._index is None:
+            from pinecone import Pinecone
+            self._index = Pinecone(api_key=Config.PINECONE_API_KEY).Index(self.index_name)
+        return self._index
+
+    def _local_index(self, embedding_function=None):
+        if self._index is None:
+            from chat.backend.local_index import LocalVectorIndex
+            self._index = LocalVectorIndex(self.index_path)
+        if embedding_function is not None:
+            self._index.embedding = embedding_function
+        return self._index
+
+    @property
+    def keyword_index(self) -> BM25Index:
+        if self._keyword_index is None:
+            self._keyword_index = BM25Index(self.collection_name)
+        return self._keyword_index
+
+    def _upsert_embedded(self, documents: List[Document], vectors: List[List[float]]):
+        with metrics.timer("vectorstore_write"):
+            self._write_vectors(documents, vectors)
+        metrics.inc(metrics.VECTORS_WRITTEN, len(documents), provider=self.provider)
+        if Config.HYBRID_SEARCH_ENABLED:
+            with metrics.timer("keyword_index_write"):
+                self.keyword_index.add(documents)
+
+    def _write_vectors(self, documents: List[Document], vectors: List[List[float]]):
+        ids = [doc.metadata["chunk_id"] for doc in documents]
+        if self.provider == "chroma":
+            collection = self.client.get_or_create_collection(name=self.collection_name)
+            collection.upsert(
+                ids=ids,
+                embeddings=vectors,
+                documents=[doc.page_content for doc in documents],
+                metadatas=[doc.metadata for doc in documents]
+            )
+        elif self.provider == "pinecone":
+            # PineconeVectorStore reads the chunk text back from the "text" metadata key.
+            self._pinecone_index().upsert(vectors=[
+                {"id": doc_id, "values": vector, "metadata": {**doc.metadata, "text": doc.page_content}}
+                for doc_id, doc, vector in zip(ids, documents, vectors)
+            ], namespace=self.namespace)
+        elif self.provider == "local":
+            self._local_index().add_vectors(ids, vectors, [doc.page_content for doc in documents], [doc.metadata for doc in documents])
+
+    def _stored_documents(self, ids: List[str]) -> List[Document]:
+        """Chunks already in the vector store, read back to rebuild the keyword index without re-embedding."""
+        documents = []
+        for start in range(0, len(ids), 100):
+            batch = ids[start:start + 100]
+            if self.provider == "chroma":
+                collection = self.client.get_or_create_collection(name=self.collection_name)
+                stored = collection.get(ids=batch, include=["documents", "metadatas"])
+                documents.extend(
+                    Document(page_content=text, metadata=metadata)
+                    for text, metadata in zip(stored["documents"], stored["metadatas"])
+                )
+            elif self.provider == "pinecone":
+                stored = self._pinecone_index().fetch(ids=batch, namespace=self.namespace)
+                for vector in stored.vectors.values():
+                    metadata = dict(vector.metadata or {})
+                    documents.append(Document(page_content=metadata.pop("text", ""), metadata=metadata))
+            elif self.provider == "local":
+                documents.extend(self._local_index().get_documents(batch))
+        return documents
+
+    def stored_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Vectors already in the store by chunk ID (missing IDs are left out), so re-ranking never re-embeds chunks."""
+        if self.provider == "chroma":
+            collection = self.client.get_or_create_collection(name=self.collection_name)
+            stored = collection.get(ids=ids, include=["embeddings"])
+            return dict(zip(stored["ids"], stored["embeddings"]))
+        if self.provider == "pinecone":
+            stored = self._pinecone_index().fetch(ids=ids, namespace=self.namespace)
+            return {doc_id: vector.values for doc_id, vector in stored.vectors.items()}
+        if self.provider == "local":
+            return self._local_index().get_vectors(ids)
+        return {}
+
     def _reset_collection(self):
         try:
             logger.info(f"Resetting vector store ({self.provider})...")
@@ -38,15 +131,15 @@ class VectorStore:
                 try:
                     self.client.delete_collection(name=self.collection_name)
                     logger.info(f"Deleted existing Chroma collection '{self.collection_name}'.")
-                except ValueError:
-                    pass 
+                except Exception as e:
+                    # Older chromadb raises ValueError, newer NotFoundError, when the collection is absent.
+                    if "does not exist" not in str(e).lower() and "not found" not in str(e).lower():
+                        raise
                     
             elif self.provider == "pinecone":
                 try:
-                    pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-                    index = pc.Index(self.index_name)
-                    index.delete(delete_all=True)
-                    logger.info(f"Cleared Pinecone index '{self.index_name}'.")
+                    self._pinecone_index().delete(delete_all=True, namespace=self.namespace)
+                    logger.info(f"Cleared namespace '{self.namespace}' of Pinecone index '{self.index_name}'.")
                 except Exception as e:
                     if "NOT_FOUND" in str(e) or "404" in str(e):
                         logger.warning(f"Index '{self.index_name}' does not exist yet. Skipping reset.")
@@ -54,36 +147,131 @@ class VectorStore:
                         logger.error(f"Failed to reset Pinecone index: {e}")
                         raise RuntimeError("Could not reset Pinecone index.")
 
+            elif self.provider == "local":
+                self._local_index().clear()
+
+            if Config.HYBRID_SEARCH_ENABLED:
+                self.keyword_index.clear()
+
         except Exception as e:
             logger.error(f"Failed to reset collection: {e}")
             raise RuntimeError(f"Could not reset vector store for new site: {e}")
 
-    def create_collection(self, documents: List[Document], embedding_function):
-        if not documents:
-            logger.warning("No documents provided to create collection.")
-            return None
-            
-        logger.info(f"Creating vector store ({self.provider}) with {len(documents)} documents.")
-        
-        self._reset_collection()
-        
+    def _open_collection(self, embedding_function):
         if self.provider == "chroma":
-            vectorstore = Chroma.from_documents(
-                documents=documents,
-                embedding=embedding_function,
-                collection_name=self.collection_name,
-                client=self.client
+            from langchain_community.vectorstores import Chroma
+            return Chroma(
+                client=self.client,
+                embedding_function=embedding_function,
+                collection_name=self.collection_name
             )
         elif self.provider == "pinecone":
-            vectorstore = PineconeVectorStore.from_documents(
-                documents=documents,
-                embedding=embedding_function,
+            from langchain_pinecone import PineconeVectorStore
+            return PineconeVectorStore(
                 index_name=self.index_name,
-                pinecone_api_key=Config.PINECONE_API_KEY
+                embedding=embedding_function,
+                pinecone_api_key=Config.PINECONE_API_KEY,
+                namespace=self.namespace
             )
-        
-        logger.info("Vector store created and persisted.")
+        elif self.provider == "local":
+            return self._local_index(embedding_function)
+        raise ValueError(f"Unsupported vector store provider: {self.provider}")
+
+    def _existing_ids(self) -> Optional[Set[str]]:
+        """IDs currently stored, or None when the provider cannot list them."""
+        try:
+            if self.provider == "chroma":
+                collection = self.client.get_or_create_collection(name=self.collection_name)
+                return set(collection.get(include=[])["ids"])
+            elif self.provider == "pinecone":
+                ids = set()
+                for page in self._pinecone_index().list(namespace=self.namespace):
+                    ids.update(page)
+                return ids
+            elif self.provider == "local":
+                return self._local_index().ids()
+        except Exception as e:
+            logger.warning(f"Could not list existing vectors ({self.provider}): {e}")
+        return None
+
+    def create_collection(self, documents: Iterable[Document], embedding_function, incremental: bool = Config.INCREMENTAL_INDEXING,
+                          progress: Optional[Callable[[int], None]] = None, keep_sources: Iterable[str] = ()):
+        """Write `documents`, replacing everything else except chunks of `keep_sources` (pages not modified since the last crawl).
+
+        `documents` may be a lazy stream: batches are embedded and upserted as they arrive, so the first vectors are
+        searchable before the stream ends. Stale vectors are deleted once it is exhausted, which is also when
+        `keep_sources` is read, so it may be filled while the stream runs.
+        """
+        existing_ids = self._existing_ids() if incremental else None
+        reset = existing_ids is None
+        seen_ids = set()
+        new_count = 0
+
+        def new_documents():
+            nonlocal existing_ids, new_count
+            for doc in documents:
+                doc_id = doc.metadata["chunk_id"]
+                # Identical chunks on the same page share an ID; keep the first.
+                if doc_id in seen_ids:
+                    continue
+                if reset and not seen_ids:
+                    # Deferred to the first document so a crawl that yields nothing leaves the old index intact.
+                    self._reset_collection()
+                    existing_ids = set()
+                seen_ids.add(doc_id)
+                if doc_id not in existing_ids:
+                    new_count += 1
+                    yield doc
+
+        pipeline = EmbeddingPipeline(embedding_function)
+        pipeline.run(new_documents(), self._upsert_embedded, progress=progress)
+
+        keep_prefixes = {content_hash(source): source for source in keep_sources}
+        if not seen_ids and not keep_prefixes:
+            logger.warning("No documents provided to create collection.")
+            return None
+        if existing_ids is None:
+            # Nothing new arrived, so the deferred reset never ran; clear out what is stored now.
+            self._reset_collection()
+            existing_ids = set()
+
+        kept_ids = {doc_id for doc_id in existing_ids if doc_id.split("-", 1)[0] in keep_prefixes}
+        found_prefixes = {doc_id.split("-", 1)[0] for doc_id in kept_ids}
+        stale_ids = list(existing_ids - seen_ids - kept_ids)
+
+        vectorstore = self._open_collection(embedding_function)
+        for start in range(0, len(stale_ids), self.WRITE_BATCH_SIZE):
+            vectorstore.delete(ids=stale_ids[start:start + self.WRITE_BATCH_SIZE])
+        if self.provider == "local":
+            vectorstore.optimize()
+        if Config.HYBRID_SEARCH_ENABLED:
+            self.keyword_index.delete(stale_ids)
+            # Collections indexed before hybrid search (or with it disabled) have vectors but no keyword entries.
+            unindexed = list((existing_ids - set(stale_ids)) - self.keyword_index.ids())
+            if unindexed:
+                logger.info(f"Adding {len(unindexed)} existing chunks to the keyword index.")
+                self.keyword_index.add(self._stored_documents(unindexed))
+
+        self.last_stats = {
+            "added": new_count,
+            "unchanged": len(seen_ids) - new_count + len(kept_ids),
+            "deleted": len(stale_ids),
+            "reset": reset,
+            "missing_sources": [source for prefix, source in keep_prefixes.items() if prefix not in found_prefixes],
+        }
+        logger.info(f"Vector store updated and persisted: {self.last_stats}")
         return vectorstore
 
+    def delete_collection(self):
+        self._reset_collection()
+        if self.provider == "local":
+            self._local_index().destroy()
+            self._index = None
+        self.keyword_index.destroy()
+        self._keyword_index = None
+
+    def load_collection(self, embedding_function):
+        return self._open_collection(embedding_function)
+
     def as_retriever(self, vectorstore):
-        return vectorstore.as_retriever(search_kwargs={"k": Config.RETRIEVAL_TOP_K})
+        return Retriever(vectorstore, self.keyword_index if Config.HYBRID_SEARCH_ENABLED else None)
@@ -0,0 +1,79 @@
+import importlib
+import logging
+import time
+from typing import Dict, List
+from chat.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Needed by every chat request, whatever the providers.
+CORE_MODULES = [
+    "chat.backend.vectorstore",
+    "chat.backend.qa_chain",
+    "chat.backend.reranker",
+    "chat.backend.prompt_budget",
+    "langchain_groq",
+    "langchain_core.prompts",
+    "langchain_core.runnables",
+    "langchain_core.output_parsers",
+]
+
+VECTOR_STORE_MODULES = {
+    "chroma": ["chromadb", "langchain_community.vectorstores"],
+    "pinecone": ["pinecone", "langchain_pinecone"],
+    "local": ["chat.backend.local_index", "hnswlib"],
+}
+
+EMBEDDING_MODULES = {
+    "huggingface": ["langchain_huggingface"],
+    "local": ["chat.backend.local_embeddings", "fastembed"],
+}
+
+def provider_modules() -> List[str]:
+    """Modules the configured embedding and vector store providers import on first use."""
+    return (CORE_MODULES
+            + VECTOR_STORE_MODULES.get(Config.VECTOR_STORE_PROVIDER, [])
+            + EMBEDDING_MODULES.get(Config.EMBEDDING_PROVIDER, []))
+
+def import_modules(modules: List[str]) -> Dict[str, float]:
+    """Import each module, returning the seconds each one added (shared dependencies count once)."""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            # Optional backends (hnswlib, fastembed) may be absent; the request path reports real misconfiguration.
+            logger.warning(f"Warm-up skipped {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+def warm_up() -> Dict[str, float]:
+    """Fork-safe warm-up: provider imports and the tokenizer tables, no connections, threads or model sessions.
+
+    Run in the gunicorn master with `preload_app` so workers inherit these pages copy-on-write.
+    """
+    start = time.perf_counter()
+    timings = import_modules(provider_modules())
+    from chat.backend.prompt_budget import _load_encoding
+    _load_encoding(Config.PROMPT_TOKENIZER)
+    logger.info(f"Warm-up imported {len(timings)} modules in {time.perf_counter() - start:.2f}s")
+    return timings
+
+def warm_worker():
+    """Per-process warm-up after the fork: build the clients that must not be shared across processes."""
+    warm_up()
+    from chat.backend.registry import registry
+    start = time.perf_counter()
+    try:
+        # Opens the embedding cache's SQLite connection; neither it nor an ONNX session survives a fork.
+        registry.get_embedding_function()
+        if Config.EMBEDDING_PROVIDER == "local":
+            from chat.backend.local_embeddings import _load_model
+            _load_model(Config.EMBEDDING_MODEL_NAME)
+    except Exception as e:
+        # A missing key or model must not stop the worker from booting; requests report it.
+        logger.warning(f"Worker warm-up incomplete: {e}")
+        return
+    logger.info(f"Worker clients ready in {time.perf_counter() - start:.2f}s")
@@ -14,17 +14,102 @@ class Config:
     REQUEST_TIMEOUT = 10
     USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
     
+    HTTP_POOL_CONNECTIONS = 10
+    HTTP_POOL_MAXSIZE = int(get_secret("HTTP_POOL_MAXSIZE", 16))
+    CONDITIONAL_GET_ENABLED = get_secret("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+    FETCH_CACHE_PATH = get_secret("FETCH_CACHE_PATH", "fetch_cache.sqlite3")
+    
     MAX_PAGES_CRAWL = 5
+    USE_SITEMAPS = get_secret("USE_SITEMAPS", "true").lower() == "true"
+    RESPECT_ROBOTS_TXT = get_secret("RESPECT_ROBOTS_TXT", "true").lower() == "true"
+    SITEMAP_MAX_FILES = 20
+    SITEMAP_MAX_URLS = 5000
+    # Per sitemap file, before and after gunzip (the sitemap protocol allows 50 MB uncompressed).
+    SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+    CRAWL_CONCURRENCY = int(get_secret("CRAWL_CONCURRENCY", 4))
+    CRAWL_PER_HOST_CONCURRENCY = int(get_secret("CRAWL_PER_HOST_CONCURRENCY", 4))
+    
+    # Extraction processes; 1 runs trafilatura inline, which suits single-core instances.
+    EXTRACTION_WORKERS = int(get_secret("EXTRACTION_WORKERS", 1))
+    EXTRACTION_CHUNK_SIZE = int(get_secret("EXTRACTION_CHUNK_SIZE", 8))
+    EXTRACTION_PAGE_TIMEOUT = float(get_secret("EXTRACTION_PAGE_TIMEOUT", 30))
+    EXTRACTION_START_METHOD = "spawn"
+    EXTRACTION_MAX_TASKS_PER_CHILD = 200
+    
+    # Items buffered between ingestion stages (pages, extracted pages); bounds peak indexing memory.
+    PIPELINE_QUEUE_DEPTH = int(get_secret("PIPELINE_QUEUE_DEPTH", 16))
+    
+    # Drop lines (nav, footer) that appear on at least this many pages of the site being indexed.
+    BOILERPLATE_FILTER_ENABLED = get_secret("BOILERPLATE_FILTER_ENABLED", "true").lower() == "true"
+    BOILERPLATE_MIN_PAGES = int(get_secret("BOILERPLATE_MIN_PAGES", 3))
     
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 150
     
-    EMBEDDING_PROVIDER = "huggingface"
+    EMBEDDING_PROVIDER = get_secret("EMBEDDING_PROVIDER", "huggingface").lower()
     EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
     HUGGINGFACEHUB_API_TOKEN = get_secret("HUGGINGFACEHUB_API_TOKEN")
+    EMBEDDING_BATCH_SIZE = int(get_secret("EMBEDDING_BATCH_SIZE", 32))
+    EMBEDDING_CONCURRENCY = int(get_secret("EMBEDDING_CONCURRENCY", 4))
+    EMBEDDING_MAX_RETRIES = int(get_secret("EMBEDDING_MAX_RETRIES", 5))
+    EMBEDDING_RETRY_BASE_DELAY = 1.0
+    LOCAL_EMBEDDING_BATCH_SIZE = int(get_secret("LOCAL_EMBEDDING_BATCH_SIZE", 64))
+    EMBEDDING_CACHE_ENABLED = get_secret("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = get_secret("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(get_secret("EMBEDDING_CACHE_MAX_ENTRIES", 200000))
     
     RETRIEVAL_TOP_K = 4
     
+    # Hybrid retrieval: a BM25 keyword index per collection, fused with vector hits by reciprocal rank fusion.
+    HYBRID_SEARCH_ENABLED = get_secret("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    BM25_INDEX_PATH = os.path.join(CHROMA_DB_PATH, "bm25_index")
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    HYBRID_FETCH_K = int(get_secret("HYBRID_FETCH_K", 20))
+    RRF_K = 60
+    # Exact-term queries skip vector search when the best keyword hit outscores the runner-up beyond top-k by this factor.
+    KEYWORD_SHORTCUT_RATIO = float(get_secret("KEYWORD_SHORTCUT_RATIO", 2.0))
+    
+    # Re-ranking: over-fetch top-k x multiplier, keep a diverse top-k by MMR, optionally re-score with a cross-encoder.
+    RERANK_ENABLED = get_secret("RERANK_ENABLED", "true").lower() == "true"
+    RERANK_FETCH_MULTIPLIER = int(get_secret("RERANK_FETCH_MULTIPLIER", 3))
+    RERANK_MMR_LAMBDA = 0.7
+    # Candidates at least this similar to an already selected chunk are dropped as near-duplicates.
+    RERANK_DUPLICATE_THRESHOLD = 0.95
+    # e.g. "Xenova/ms-marco-MiniLM-L-6-v2"; empty disables the cross-encoder.
+    RERANK_CROSS_ENCODER_MODEL = get_secret("RERANK_CROSS_ENCODER_MODEL", "")
+    
+    # Prompt token budget (template + question + history + context); history yields to context below the minimum.
+    PROMPT_TOKENIZER = "cl100k_base"
+    PROMPT_TOKEN_BUDGET = int(get_secret("PROMPT_TOKEN_BUDGET", 3000))
+    PROMPT_HISTORY_TOKENS = int(get_secret("PROMPT_HISTORY_TOKENS", 500))
+    PROMPT_QUESTION_TOKENS = 300
+    PROMPT_MIN_CONTEXT_TOKENS = 1000
+    CHAT_HISTORY_MAX_MESSAGES = 10
+    
+    # Conversations: the last CHAT_HISTORY_MAX_MESSAGES turns are served from the Django cache (Redis if REDIS_URL is set).
+    CONVERSATION_CACHE_TTL = int(get_secret("CONVERSATION_CACHE_TTL", 3600))
+    # Messages rendered when the chat page loads.
+    CONVERSATION_PAGE_MESSAGES = 50
+    
+    ANSWER_CACHE_ENABLED = get_secret("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES = int(get_secret("ANSWER_CACHE_MAX_ENTRIES", 512))
+    ANSWER_CACHE_TTL = int(get_secret("ANSWER_CACHE_TTL", 3600))
+    # Cosine similarity above which a differently-worded query reuses a cached answer; None disables it.
+    ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+    
+    INDEX_JOB_WORKERS = int(get_secret("INDEX_JOB_WORKERS", 2))
+    # Pending/running jobs with no progress for this long are assumed lost (restart, OOM kill) and marked failed.
+    INDEX_JOB_STALE_SECONDS = int(get_secret("INDEX_JOB_STALE_SECONDS", 900))
+    
+    # Stage timers and counters, served on /metrics and as Server-Timing on /api/chat/.
+    METRICS_ENABLED = get_secret("METRICS_ENABLED", "true").lower() == "true"
+    # Bearer token for scraping /metrics; staff users can always read it.
+    METRICS_TOKEN = get_secret("METRICS_TOKEN", "")
+    
+    MAX_COLLECTIONS = int(get_secret("MAX_COLLECTIONS", 20))
+    COLLECTION_TOUCH_INTERVAL = 60
+    
     GROQ_API_KEY = get_secret("GROQ_API_KEY")
     LLM_MODEL_NAME = "llama-3.3-70b-versatile"
     LLM_BASE_URL = "https://api.groq.com/openai/v1"
@@ -33,6 +118,16 @@ class Config:
     PINECONE_API_KEY = get_secret("PINECONE_API_KEY")
     VECTOR_STORE_PROVIDER = get_secret("VECTOR_STORE_PROVIDER", "chroma").lower()
     PINECONE_INDEX_NAME = "website-content"
+    
+    # VECTOR_STORE_PROVIDER=local: memory-mapped vectors per collection, brute force below the HNSW threshold.
+    LOCAL_INDEX_PATH = "local_index"
+    LOCAL_INDEX_DTYPE = get_secret("LOCAL_INDEX_DTYPE", "float32")
+    LOCAL_INDEX_HNSW_THRESHOLD = int(get_secret("LOCAL_INDEX_HNSW_THRESHOLD", 20000))
+    LOCAL_INDEX_HNSW_M = 16
+    LOCAL_INDEX_HNSW_EF_CONSTRUCTION = 200
+    LOCAL_INDEX_HNSW_EF_SEARCH = 64
+    LOCAL_INDEX_COMPACT_RATIO = 0.3
+    INCREMENTAL_INDEXING = get_secret("INCREMENTAL_INDEXING", "true").lower() == "true"
 
     @classmethod
     def validate(cls):
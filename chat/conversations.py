@@ -0,0 +1,82 @@
+import logging
+from django.core.cache import cache
+from .config import Config
+from .models import ChatMessage, Conversation
+
+logger = logging.getLogger(__name__)
+
+# The question being answered plus the history QAChain may use.
+WINDOW_SIZE = Config.CHAT_HISTORY_MAX_MESSAGES + 1
+
+
+def _window_key(conversation_id, last_message_id):
+    # Keyed by the newest message id the session has seen: a worker holding an older window
+    # (locmem is per process) misses and reloads instead of serving stale history.
+    return f"chat:conversation:{conversation_id}:{last_message_id}"
+
+
+async def _acache_get(key):
+    try:
+        return await cache.aget(key)
+    except Exception as e:
+        logger.warning(f"Conversation cache read failed, falling back to the database: {e}")
+        return None
+
+
+async def _acache_set(key, window):
+    try:
+        await cache.aset(key, window, Config.CONVERSATION_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Conversation cache write failed: {e}")
+
+
+async def aconversation_id(request):
+    """The session's conversation, started on first use. The session holds only its id."""
+    conversation_id = await request.session.aget('conversation_id')
+    if conversation_id is None:
+        conversation = await Conversation.objects.acreate(owner=await request.auser())
+        conversation_id = conversation.pk
+        await request.session.aset('conversation_id', conversation_id)
+        await request.session.aset('conversation_last_message_id', None)
+    return conversation_id
+
+
+async def arecent_messages(request):
+    """The last WINDOW_SIZE messages of the session's conversation, oldest first."""
+    conversation_id = await aconversation_id(request)
+    last_message_id = await request.session.aget('conversation_last_message_id')
+    if last_message_id is None:
+        return []
+
+    key = _window_key(conversation_id, last_message_id)
+    window = await _acache_get(key)
+    if window is None:
+        rows = ChatMessage.objects.filter(conversation_id=conversation_id).order_by('-id')[:WINDOW_SIZE]
+        window = [message.as_dict() async for message in rows][::-1]
+        await _acache_set(key, window)
+    return window
+
+
+async def aappend_message(request, window, role, content):
+    """Append one message (a single-row insert) and return the window with it added."""
+    conversation_id = await aconversation_id(request)
+    message = await ChatMessage.objects.acreate(conversation_id=conversation_id, role=role, content=content)
+    window = (list(window) + [message.as_dict()])[-WINDOW_SIZE:]
+    await _acache_set(_window_key(conversation_id, message.pk), window)
+    await request.session.aset('conversation_last_message_id', message.pk)
+    return window
+
+
+def page_messages(request, limit=Config.CONVERSATION_PAGE_MESSAGES):
+    """The last `limit` messages of the session's conversation for rendering the chat page."""
+    conversation_id = request.session.get('conversation_id')
+    if conversation_id is None:
+        return []
+    rows = ChatMessage.objects.filter(conversation_id=conversation_id).order_by('-id')[:limit]
+    return [message.as_dict() for message in rows][::-1]
+
+
+def start_new_conversation(request):
+    # Earlier conversations stay in the database; the next message opens a fresh one.
+    request.session.pop('conversation_id', None)
+    request.session.pop('conversation_last_message_id', None)
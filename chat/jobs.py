@@ -0,0 +1,118 @@
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from .config import Config
+from .models import IndexJob, SiteCollection
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.INDEX_JOB_WORKERS, thread_name_prefix="index-job")
+        return _executor
+
+
+def _stale_jobs():
+    # Jobs only live in the executor of the process that queued them; progress updates keep updated_at
+    # fresh, so a job that stopped updating was lost with its process.
+    cutoff = timezone.now() - timedelta(seconds=Config.INDEX_JOB_STALE_SECONDS)
+    return IndexJob.objects.filter(status__in=[IndexJob.STATUS_PENDING, IndexJob.STATUS_RUNNING], updated_at__lt=cutoff)
+
+
+STALE_JOB_ERROR = "Indexing was interrupted (the server restarted). Please try again."
+
+
+def expire_stale_jobs():
+    """Mark jobs orphaned by a restart or crash as failed, so their collection can be indexed again."""
+    expired = _stale_jobs().update(status=IndexJob.STATUS_FAILED, error=STALE_JOB_ERROR, finished_at=timezone.now())
+    if expired:
+        logger.warning(f"Marked {expired} stale index jobs as failed")
+    return expired
+
+
+def start_index_job(user, url):
+    """Return (collection, job) for indexing `url`: the collection's active job if it has one, else a new queued job."""
+    collection = SiteCollection.for_site(user, url)
+    expire_stale_jobs()
+    active = IndexJob.objects.filter(
+        collection_name=collection.name, status__in=[IndexJob.STATUS_PENDING, IndexJob.STATUS_RUNNING]
+    )
+    try:
+        with transaction.atomic():
+            # Serialises concurrent starts for the collection (on SQLite the unique constraint does it).
+            SiteCollection.objects.select_for_update().filter(pk=collection.pk).first()
+            job = active.first()
+            if job is None:
+                job = IndexJob.objects.create(user=user, url=url, collection_name=collection.name)
+                transaction.on_commit(lambda: submit_index_job(job))
+    except IntegrityError:
+        # Lost the race against another request that just queued a job for this collection.
+        job = active.get()
+    return collection, job
+
+
+astart_index_job = sync_to_async(start_index_job)
+
+
+def submit_index_job(job):
+    """Queue an IndexJob to run in the background and return immediately."""
+    _get_executor().submit(_run_index_job, job.pk)
+    logger.info(f"Queued index job {job.pk} for {job.url}")
+
+
+def _run_index_job(job_id):
+    from .backend.indexer import Indexer, IndexingError
+    from .backend.registry import registry
+
+    close_old_connections()
+    jobs = IndexJob.objects.filter(pk=job_id)
+
+    job_thread = threading.current_thread()
+
+    def progress(**fields):
+        jobs.update(updated_at=timezone.now(), **fields)
+        if threading.current_thread() is not job_thread:
+            # The crawl and extract stages report from their own threads; don't leave a connection open per thread.
+            connection.close()
+
+    # A job that waited in the queue past INDEX_JOB_STALE_SECONDS was already marked failed; don't run it.
+    if not jobs.filter(status=IndexJob.STATUS_PENDING).update(status=IndexJob.STATUS_RUNNING, updated_at=timezone.now()):
+        logger.warning(f"Index job {job_id} is no longer pending; skipping")
+        close_old_connections()
+        return
+
+    try:
+        job = jobs.get()
+
+        indexer = Indexer(registry.get_embedding_function(), collection_name=job.collection_name, progress=progress)
+        stats = indexer.run(job.url)
+
+        # Bump the shared version before dropping this process's handles, so none are rebuilt under the old one.
+        SiteCollection.objects.filter(name=job.collection_name).update(
+            chunk_count=stats["chunks_total"], last_indexed_at=timezone.now(), last_used_at=timezone.now()
+        )
+        registry.invalidate(job.collection_name)
+        jobs.update(status=IndexJob.STATUS_SUCCEEDED, stage="completed", finished_at=timezone.now())
+    except IndexingError as e:
+        jobs.update(status=IndexJob.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+    except Exception as e:
+        logger.error(f"Index job {job_id} failed: {e}", exc_info=True)
+        jobs.update(status=IndexJob.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+
+    try:
+        from .site_collections import garbage_collect
+        garbage_collect()
+    except Exception as e:
+        logger.error(f"Collection garbage collection failed: {e}", exc_info=True)
+    finally:
+        close_old_connections()
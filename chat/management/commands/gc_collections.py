@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from chat.config import Config
+from chat.site_collections import garbage_collect
+
+
+class Command(BaseCommand):
+    help = "Delete the least recently used site collections beyond MAX_COLLECTIONS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=Config.MAX_COLLECTIONS, help='Number of collections to keep.')
+        parser.add_argument('--dry-run', action='store_true', help='List the collections that would be deleted.')
+
+    def handle(self, *args, **options):
+        deleted = garbage_collect(max_collections=options['keep'], dry_run=options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f"{verb} {len(deleted)} collection(s).")
+        for name in deleted:
+            self.stdout.write(f"  {name}")
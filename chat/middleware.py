@@ -0,0 +1,48 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .config import Config
+from .backend import metrics
+
+REQUEST_SECONDS = metrics.metrics_registry.histogram(
+    "webchat_request_duration_seconds", "Time to build the response, by view.", ["view"])
+
+
+class ServerTimingMiddleware:
+    """Records request latency per view and adds a Server-Timing header listing the stages timed for the request.
+
+    Streaming responses only include stages that ran before the body started streaming.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not Config.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with metrics.collect_request_timings() as timings:
+            response = self.get_response(request)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not Config.METRICS_ENABLED:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        with metrics.collect_request_timings() as timings:
+            response = await self.get_response(request)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, seconds):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            REQUEST_SECONDS.observe(seconds, view=match.url_name)
+        if timings:
+            response['Server-Timing'] = metrics.server_timing_header(timings, total=seconds)
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-17 20:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexjob',
+            name='collection_name',
+            field=models.CharField(default='website_content', max_length=63),
+        ),
+        migrations.CreateModel(
+            name='SiteCollection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=63, unique=True)),
+                ('site_domain', models.CharField(max_length=255)),
+                ('site_url', models.URLField(max_length=2048)),
+                ('chunk_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_indexed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='site_collections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-last_used_at'],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'site_domain'), name='unique_site_collection_per_owner')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.1.2 on 2026-10-17 21:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    # Earlier races could leave several active jobs for one collection; keep the newest.
+    IndexJob = apps.get_model('chat', 'IndexJob')
+    seen = set()
+    for job in IndexJob.objects.filter(status__in=['pending', 'running']).order_by('-created_at'):
+        if job.collection_name in seen:
+            job.status = 'failed'
+            job.error = 'Superseded by a newer indexing run.'
+            job.save(update_fields=['status', 'error'])
+        seen.add(job.collection_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_conversations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='indexjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('collection_name',), name='one_active_index_job_per_collection'),
+        ),
+    ]
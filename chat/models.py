@@ -1,3 +1,142 @@
+import hashlib
+from urllib.parse import urlparse
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class SiteCollection(models.Model):
+    """A vector store collection (Chroma collection or Pinecone namespace) holding one owner's copy of one site."""
+
+    name = models.CharField(max_length=63, unique=True)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='site_collections')
+    site_domain = models.CharField(max_length=255)
+    site_url = models.URLField(max_length=2048)
+    chunk_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_indexed_at = models.DateTimeField(null=True, blank=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_used_at']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'site_domain'], name='unique_site_collection_per_owner'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.site_domain})"
+
+    @staticmethod
+    def name_for(owner_id, site_domain):
+        digest = hashlib.sha256(f"{owner_id}:{site_domain}".encode("utf-8")).hexdigest()[:16]
+        return f"site-{digest}"
+
+    @classmethod
+    def for_site(cls, owner, url):
+        site_domain = urlparse(url).netloc.lower()
+        collection, _ = cls.objects.get_or_create(
+            owner=owner,
+            site_domain=site_domain,
+            defaults={'name': cls.name_for(owner.pk, site_domain), 'site_url': url},
+        )
+        return collection
+
+
+class IndexJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='index_jobs')
+    url = models.URLField(max_length=2048)
+    collection_name = models.CharField(max_length=63, default='website_content')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    stage = models.CharField(max_length=32, blank=True)
+    pages_fetched = models.PositiveIntegerField(default=0)
+    pages_extracted = models.PositiveIntegerField(default=0)
+    chunks_count = models.PositiveIntegerField(default=0)
+    vectors_written = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # One indexing run per collection at a time, even when two requests race to start one.
+            models.UniqueConstraint(
+                fields=['collection_name'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='one_active_index_job_per_collection',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def as_dict(self):
+        return {
+            'job_id': self.pk,
+            'url': self.url,
+            'collection': self.collection_name,
+            'status': self.status,
+            'stage': self.stage,
+            'pages_fetched': self.pages_fetched,
+            'pages_extracted': self.pages_extracted,
+            'chunks_count': self.chunks_count,
+            'vectors_written': self.vectors_written,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class Conversation(models.Model):
+    """One chat thread; its messages live in ChatMessage so a turn appends rows instead of rewriting the history."""
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversations')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Conversation {self.pk} ({self.owner})"
+
+
+class ChatMessage(models.Model):
+    ROLE_USER = 'user'
+    ROLE_ASSISTANT = 'assistant'
+    ROLE_CHOICES = [
+        (ROLE_USER, 'User'),
+        (ROLE_ASSISTANT, 'Assistant'),
+    ]
+
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=16, choices=ROLE_CHOICES)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Serves "last N messages of a conversation" as an index range scan.
+            models.Index(fields=['conversation', 'id'], name='chat_message_window_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
+
+    def as_dict(self):
+        return {'role': self.role, 'content': self.content}
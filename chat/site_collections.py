@@ -0,0 +1,60 @@
+import logging
+from datetime import timedelta
+from django.utils import timezone
+from .config import Config
+from .models import IndexJob, SiteCollection
+
+logger = logging.getLogger(__name__)
+
+
+async def acollection_for_chat(request):
+    """The collection the user is chatting with: the one last indexed in this session, else their most recently used."""
+    name = await request.session.aget('collection_name')
+    queryset = SiteCollection.objects.filter(owner=await request.auser())
+    collection = await queryset.filter(name=name).afirst() if name else None
+    if collection is None:
+        collection = await queryset.afirst()
+    if collection is not None:
+        await atouch(collection)
+    return collection
+
+
+async def atouch(collection):
+    # Avoid a write on every chat message; LRU ordering only needs coarse timestamps.
+    now = timezone.now()
+    if now - collection.last_used_at > timedelta(seconds=Config.COLLECTION_TOUCH_INTERVAL):
+        await SiteCollection.objects.filter(pk=collection.pk).aupdate(last_used_at=now)
+        collection.last_used_at = now
+
+
+def garbage_collect(max_collections=Config.MAX_COLLECTIONS, dry_run=False):
+    """Delete the least recently used collections beyond `max_collections`. Returns the deleted names."""
+    from .backend.vectorstore import VectorStore
+    from .backend.registry import registry
+    from .backend.fetch_cache import FetchCache, PageLinesCache
+    from .jobs import expire_stale_jobs
+
+    if not dry_run:
+        expire_stale_jobs()
+    busy = IndexJob.objects.filter(
+        status__in=[IndexJob.STATUS_PENDING, IndexJob.STATUS_RUNNING]
+    ).values_list('collection_name', flat=True)
+    idle = SiteCollection.objects.exclude(name__in=list(busy)).order_by('-last_used_at')[max_collections:]
+
+    deleted = []
+    for collection in idle:
+        if not dry_run:
+            try:
+                VectorStore(collection_name=collection.name).delete_collection()
+            except Exception as e:
+                logger.error(f"Failed to delete collection '{collection.name}': {e}")
+                continue
+            registry.invalidate(collection.name)
+            FetchCache(collection.name).clear()
+            PageLinesCache(collection.name).clear()
+            collection.delete()
+        deleted.append(collection.name)
+
+    if deleted:
+        logger.info(f"Garbage-collected {len(deleted)} idle collections: {deleted}")
+    return deleted
@@ -38,9 +38,7 @@ async function indexUrl() {
         }
 
         if (data.success) {
-            statusDiv.style.backgroundColor = '#f0fdf4';
-            statusDiv.style.color = '#166534';
-            statusDiv.innerHTML = `✅ Successfully indexed! Found ${data.chunks_count} chunks.`;
+            await pollIndexJob(data.job_id, statusDiv);
         } else {
             statusDiv.style.backgroundColor = '#fef2f2';
             statusDiv.style.color = '#991b1b';
@@ -53,6 +51,35 @@ async function indexUrl() {
     }
 }
 
+async function pollIndexJob(jobId, statusDiv) {
+    while (true) {
+        const response = await fetch(`/api/index/${jobId}/`);
+        const job = await response.json();
+
+        if (!job.success) {
+            throw new Error(job.error);
+        }
+
+        if (job.status === 'succeeded') {
+            statusDiv.style.backgroundColor = '#f0fdf4';
+            statusDiv.style.color = '#166534';
+            statusDiv.innerHTML = `✅ Successfully indexed! Found ${job.chunks_count} chunks.`;
+            return;
+        }
+
+        if (job.status === 'failed') {
+            statusDiv.style.backgroundColor = '#fef2f2';
+            statusDiv.style.color = '#991b1b';
+            statusDiv.innerHTML = `❌ Error: ${job.error}`;
+            return;
+        }
+
+        const stage = job.stage || 'queued';
+        statusDiv.innerHTML = `<div class="loader"></div> Indexing (${stage})... ${job.pages_fetched} pages fetched, ${job.chunks_count} chunks, ${job.vectors_written} vectors written.`;
+        await new Promise(resolve => setTimeout(resolve, 1500));
+    }
+}
+
 function createTypingIndicator() {
     const msgDiv = document.createElement('div');
     msgDiv.className = 'message assistant loading-message';
@@ -92,6 +119,31 @@ function handleKeyPress(event) {
 }
 
 
+function renderAssistantContent(answer, sources) {
+    let content = answer;
+    if (sources && sources.length > 0) {
+        content += '<br><br><small><strong>Sources:</strong><ul>';
+        sources.forEach(src => {
+            content += `<li><a href="${src.source}" target="_blank">${src.title || 'Source'}</a></li>`;
+        });
+        content += '</ul></small>';
+    }
+    return content;
+}
+
+function parseSseEvent(rawEvent) {
+    let event = 'message';
+    let data = '';
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) {
+            event = line.slice(7);
+        } else if (line.startsWith('data: ')) {
+            data += line.slice(6);
+        }
+    });
+    return { event: event, data: data ? JSON.parse(data) : {} };
+}
+
 async function sendMessage() {
     const chatInput = document.getElementById('chatInput');
     const message = chatInput.value;
@@ -107,7 +159,7 @@ async function sendMessage() {
     messagesArea.scrollTop = messagesArea.scrollHeight;
 
     try {
-        const response = await fetch('/api/chat/', {
+        const response = await fetch('/api/chat/stream/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -121,34 +173,56 @@ async function sendMessage() {
             return;
         }
 
-        const text = await response.text();
-        let data;
-        try {
-            data = JSON.parse(text);
-        } catch (e) {
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('text/event-stream')) {
             messagesArea.removeChild(loadingMsg);
             appendMessage('assistant', "Error: Server returned invalid response. You may need to log in again.");
             return;
         }
 
-        messagesArea.removeChild(loadingMsg);
-
-        if (data.answer) {
-            let content = data.answer;
-            if (data.sources && data.sources.length > 0) {
-                content += '<br><br><small><strong>Sources:</strong><ul>';
-                data.sources.forEach(src => {
-                    content += `<li><a href="${src.source}" target="_blank">${src.title || 'Source'}</a></li>`;
-                });
-                content += '</ul></small>';
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+        let sources = [];
+        let contentDiv = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const parsed = parseSseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+
+                if (parsed.event === 'sources') {
+                    sources = parsed.data.sources;
+                    continue;
+                }
+                if (parsed.event === 'token' || parsed.event === 'error') {
+                    answer += parsed.data.text;
+                }
+                if (!contentDiv) {
+                    messagesArea.removeChild(loadingMsg);
+                    appendMessage('assistant', '');
+                    contentDiv = messagesArea.lastElementChild.querySelector('.content');
+                }
+                contentDiv.innerHTML = parsed.event === 'done' ? renderAssistantContent(answer, sources) : answer;
+                messagesArea.scrollTop = messagesArea.scrollHeight;
             }
-            appendMessage('assistant', content);
-        } else {
+        }
+
+        if (!contentDiv) {
+            messagesArea.removeChild(loadingMsg);
             appendMessage('assistant', 'Sorry, I encountered an error.');
         }
 
     } catch (e) {
-        messagesArea.removeChild(loadingMsg);
+        if (loadingMsg.parentNode) {
+            messagesArea.removeChild(loadingMsg);
+        }
         appendMessage('assistant', `Error: ${e.message}`);
     }
 }
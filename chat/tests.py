@@ -1,3 +1,65 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.site import SyntheticSite, serve
+from chat.backend.indexer import Indexer
+from chat.backend.local_index import LocalVectorIndex
+from chat.config import Config
+
+
+class NoticeSite(SyntheticSite):
+    """A synthetic site whose pages all repeat one notice inside the article, where extraction keeps it."""
+
+    NOTICE = "Support is available on weekdays from nine to five, excluding public holidays."
+
+    def _render(self, i: int) -> str:
+        return super()._render(i).replace("<article>", f"<article><p>{self.NOTICE}</p>", 1)
+
+    def edit(self, i: int, paragraph: str):
+        self._html[self.path(i)] = self._html[self.path(i)].replace("</article>", f"<p>{paragraph}</p></article>", 1)
+
+
+@mock.patch.object(Config, "VECTOR_STORE_PROVIDER", "local")
+@mock.patch.object(Config, "BOILERPLATE_FILTER_ENABLED", True)
+@mock.patch.object(Config, "INCREMENTAL_INDEXING", True)
+@mock.patch.object(Config, "CONDITIONAL_GET_ENABLED", True)
+class BoilerplateReindexTests(TestCase):
+    def setUp(self):
+        # Indexes and caches live under relative paths.
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(workdir)
+        self.site = NoticeSite(pages=6, paragraphs=2, words_per_paragraph=30)
+        server = serve(self.site)
+        self.url = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+
+    def index(self):
+        return Indexer(FakeEmbeddings(), "reindex", max_pages=self.site.pages).run(self.url)
+
+    def documents(self, source=None):
+        index = LocalVectorIndex(os.path.join(Config.LOCAL_INDEX_PATH, "reindex"))
+        docs = index.get_documents(sorted(index.ids()))
+        return [doc for doc in docs if source is None or doc.metadata["source"] == source]
+
+    def test_notice_stays_out_of_pages_changed_while_others_return_304(self):
+        self.index()
+        # Pages chunked before the notice was known are refetched and fixed on the next run.
+        self.index()
+        self.assertFalse([doc for doc in self.documents() if NoticeSite.NOTICE in doc.page_content])
+
+        self.site.edit(3, "Release notes for the quarterly maintenance window.")
+        stats = self.index()
+        self.assertEqual(stats["pages_extracted"], 1)
+        edited = self.documents(self.url.replace("/index.html", self.site.path(3)))
+        self.assertTrue(any("quarterly maintenance" in doc.page_content for doc in edited))
+        self.assertFalse([doc for doc in edited if NoticeSite.NOTICE in doc.page_content])
+
+        stats = self.index()
+        self.assertEqual((stats["pages_extracted"], stats["vectors_written"]), (0, 0))
@@ -7,5 +7,8 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('clear_chat/', views.clear_chat, name='clear_chat'),
     path('api/index/', views.api_index, name='api_index'),
+    path('api/index/<int:job_id>/', views.api_index_status, name='api_index_status'),
     path('api/chat/', views.api_chat, name='api_chat'),
+    path('api/chat/stream/', views.api_chat_stream, name='api_chat_stream'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,19 +1,20 @@
+import hmac
 import json
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.cache import never_cache
 from .config import Config
 
-from .backend.crawler import Crawler
-from .backend.extractor import Extractor
-from .backend.cleaner import Cleaner
-from .backend.chunker import Chunker
-from .backend.vectorstore import VectorStore
-from .backend.qa_chain import QAChain
-from .backend.embedder import Embedder
+from .models import IndexJob
+from .jobs import astart_index_job
+from .site_collections import acollection_for_chat
+from .conversations import aappend_message, arecent_messages, page_messages, start_new_conversation
+from .backend.registry import registry
+from .backend.metrics import metrics_registry
 
 def login_view(request):
     if request.user.is_authenticated:
@@ -38,17 +39,26 @@ def logout_view(request):
 @ensure_csrf_cookie
 @never_cache
 def index(request):
-    if 'messages' not in request.session:
-        request.session['messages'] = []
-    return render(request, 'chat/index.html')
+    # Sessions from before the conversation store kept the whole history here.
+    request.session.pop('messages', None)
+    return render(request, 'chat/index.html', {'chat_messages': page_messages(request)})
+
+@never_cache
+def metrics_view(request):
+    # Scrapers authenticate with METRICS_TOKEN as a bearer token; staff can read it from a browser session.
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    authorized = (Config.METRICS_TOKEN and hmac.compare_digest(token, Config.METRICS_TOKEN)) or request.user.is_staff
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @login_required
 def clear_chat(request):
-    request.session['messages'] = []
+    start_new_conversation(request)
     return redirect('index')
 
 @login_required
-def api_index(request):
+async def api_index(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
@@ -57,57 +67,13 @@ def api_index(request):
             if not url_to_index:
                 return JsonResponse({'success': False, 'error': 'No URL provided'})
 
-            crawler = Crawler()
-            crawled_pages = crawler.crawl(url_to_index)
-            
-            if not crawled_pages:
-                return JsonResponse({'success': False, 'error': 'Could not crawl any pages from the URL. The website might be blocking bot access or the URL is invalid.'})
-
-            extractor = Extractor()
-            extracted_data = []
-            for page in crawled_pages:
-                result = extractor.extract(page['html'])
-                if result:
-                    extracted_data.append({
-                        "url": page['url'], 
-                        "text": result['text'], 
-                        "title": result['title']
-                    })
-            
-            cleaner = Cleaner()
-            chunker = Chunker()
-            all_chunks = []
-            
-            for data in extracted_data:
-                clean_text = cleaner.clean(data['text'])
-                chunks = chunker.chunk(clean_text, data['url'], data['title'])
-                all_chunks.extend(chunks)
-            
-            if not all_chunks:
-                # Diagnostics: Check if extraction failed (Crawling success but no data)
-                if crawled_pages and not extracted_data:
-                    # Provide hint about what was downloaded
-                    import re
-                    first_html_snippet = crawled_pages[0]['html'][:1000]
-                    title_match = re.search(r'<title>(.*?)</title>', first_html_snippet, re.IGNORECASE)
-                    page_title = title_match.group(1).strip() if title_match else "No Title Found"
-                    
-                    return JsonResponse({
-                        'success': False, 
-                        'error': f'Crawling worked ({len(crawled_pages)} pages) but extraction failed. The site might be blocking the bot. Page Title: "{page_title}"'
-                    })
-
-                return JsonResponse({'success': False, 'error': 'No text content could be extracted from the website. It might be empty or protected.'})
-
-            embedder = Embedder()
-            embedding_function = embedder.get_embedding_function()
-            
-            vs_wrapper = VectorStore(collection_name="website_content")
-            vectorstore = vs_wrapper.create_collection(all_chunks, embedding_function)
+            # One indexing run per collection at a time; other sites index concurrently.
+            collection, job = await astart_index_job(await request.auser(), url_to_index)
             
-            request.session['indexed_url'] = url_to_index
+            await request.session.aset('indexed_url', url_to_index)
+            await request.session.aset('collection_name', collection.name)
             
-            return JsonResponse({'success': True, 'chunks_count': len(all_chunks)})
+            return JsonResponse({'success': True, 'job_id': job.pk, 'status': job.status}, status=202)
             
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
@@ -115,58 +81,58 @@ def api_index(request):
     return JsonResponse({'success': False, 'error': 'Invalid method'})
 
 @login_required
-def api_chat(request):
+async def api_index_status(request, job_id):
+    try:
+        job = await IndexJob.objects.aget(pk=job_id, user=await request.auser())
+    except IndexJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    return JsonResponse({'success': True, **job.as_dict()})
+
+NO_COLLECTION_ANSWER = "Please index a website first."
+
+def _chat_history(messages):
+    # Earlier turns only (the last message is the question itself); QAChain trims them to its token budget.
+    return messages[:-1][-Config.CHAT_HISTORY_MAX_MESSAGES:]
+
+def _format_sources(docs):
+    return [{"source": doc.metadata.get('source'), "title": doc.metadata.get('title')} for doc in docs]
+
+def _sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+# Opening a collection can touch disk or the network; keep it off the event loop without serialising requests.
+_aget_qa_chain = sync_to_async(registry.get_qa_chain, thread_sensitive=False)
+
+async def _get_qa_chain(collection):
+    # last_indexed_at is shared by all workers, so a re-index in one of them retires the others' handles and cached answers.
+    version = collection.last_indexed_at.isoformat() if collection.last_indexed_at else None
+    return await _aget_qa_chain(collection.name, version)
+
+@login_required
+async def api_chat(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             user_message = data.get('message')
             
-            messages = request.session.get('messages', [])
-            messages.append({"role": "user", "content": user_message})
-            request.session['messages'] = messages
+            messages = await aappend_message(request, await arecent_messages(request), 'user', user_message)
             
             try:
-                embedder = Embedder()
-                embedding_function = embedder.get_embedding_function()
-                vs_wrapper = VectorStore(collection_name="website_content")
-                
-                if Config.VECTOR_STORE_PROVIDER == "chroma":
-                    from langchain_community.vectorstores import Chroma
-                    vectorstore = Chroma(
-                        persist_directory=Config.CHROMA_DB_PATH,
-                        embedding_function=embedding_function,
-                        collection_name="website_content"
-                    )
-                elif Config.VECTOR_STORE_PROVIDER == "pinecone":
-                    from langchain_pinecone import PineconeVectorStore
-                    if Config.PINECONE_API_KEY:
-                        import os
-                        os.environ["PINECONE_API_KEY"] = Config.PINECONE_API_KEY
-                        
-                    vectorstore = PineconeVectorStore.from_existing_index(
-                        index_name=Config.PINECONE_INDEX_NAME,
-                        embedding=embedding_function
-                    )
-                
-                retriever = vs_wrapper.as_retriever(vectorstore)
-                qa_chain = QAChain(retriever)
-                
-                history_window = messages[-5:]
-                chat_history_str = ""
-                for msg in history_window:
-                    role_label = "Human" if msg["role"] == "user" else "AI"
-                    chat_history_str += f"{role_label}: {msg['content']}\n"
+                collection = await acollection_for_chat(request)
+                chat_history = _chat_history(messages)
                 
-                result = qa_chain.answer(user_message, chat_history=chat_history_str)
+                if collection is None:
+                    result = {"answer": NO_COLLECTION_ANSWER, "sources": []}
+                else:
+                    qa_chain = await _get_qa_chain(collection)
+                    result = await qa_chain.aanswer(user_message, chat_history=chat_history)
                 
                 answer_text = result['answer']
-                sources = [{"source": doc.metadata.get('source'), "title": doc.metadata.get('title')} for doc in result['sources']]
+                sources = _format_sources(result['sources'])
                 
-                messages.append({"role": "assistant", "content": answer_text})
-                request.session['messages'] = messages
-                request.session.modified = True
+                await aappend_message(request, messages, 'assistant', answer_text)
                 
-                return JsonResponse({'answer': answer_text, 'sources': sources})
+                return JsonResponse({'answer': answer_text, 'sources': sources, 'usage': result.get('usage')})
 
             except Exception as e:
                 return JsonResponse({'answer': f"Error: {str(e)}"})
@@ -175,4 +141,49 @@ def api_chat(request):
             return JsonResponse({'error': str(e)})
 
     return JsonResponse({'error': 'Invalid method'})
+
+async def _no_collection_events():
+    yield {"type": "sources", "sources": []}
+    yield {"type": "token", "text": NO_COLLECTION_ANSWER}
+    yield {"type": "done", "answer": NO_COLLECTION_ANSWER}
+
+@login_required
+async def api_chat_stream(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'})
+
+    try:
+        data = json.loads(request.body)
+        user_message = data.get('message')
+        
+        messages = await aappend_message(request, await arecent_messages(request), 'user', user_message)
+        
+        chat_history = _chat_history(messages)
+        collection = await acollection_for_chat(request)
+        qa_chain = await _get_qa_chain(collection) if collection is not None else None
+    except Exception as e:
+        return JsonResponse({'error': str(e)})
+
+    async def event_stream():
+        if qa_chain is None:
+            events = _no_collection_events()
+        else:
+            events = qa_chain.astream_answer(user_message, chat_history=chat_history)
+        async for event in events:
+            if event["type"] == "sources":
+                yield _sse_event("sources", {"sources": _format_sources(event["sources"])})
+            elif event["type"] == "token":
+                yield _sse_event("token", {"text": event["text"]})
+            elif event["type"] == "error":
+                yield _sse_event("error", {"text": event["text"]})
+            elif event["type"] == "done":
+                # The session middleware has already saved by the time the body streams, so persist explicitly.
+                await aappend_message(request, messages, 'assistant', event["answer"])
+                await request.session.asave()
+                yield _sse_event("done", {"usage": event.get("usage")})
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 # touch
@@ -1,16 +1,40 @@
 # Gunicorn Configuration
+import os
 
 # Bind to 0.0.0.0 (all interfaces) properly for Render
 bind = "0.0.0.0:10000"
 
-# Workers: Reduce to 1 to avoid OOM on free tier (512MB RAM)
-# Even 2 workers is too much for LangChain + Pinecone
-workers = 1
+# ASGI worker: async chat views wait on Groq without holding a thread, so one
+# process serves many concurrent chats.
+worker_class = "uvicorn_worker.UvicornWorker"
 
-# Increase timeout to 120 seconds to allow for slow imports (langchain/pinecone)
-timeout = 120
+# Workers: keep 1 on the free tier (512MB RAM) to avoid OOM. Each worker still
+# loads its own embedding model, vector store client, registry and answer cache,
+# and conversation windows are per process unless REDIS_URL is set. Raise
+# WEB_CONCURRENCY only on larger instances; preload_app keeps the shared import
+# cost down (see benchmarks/startup.py).
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+# Load the app and warm up provider imports in the master before forking;
+# workers share those pages copy-on-write. GUNICORN_PRELOAD=false disables it.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Covers per-worker warm-up (embedding model load) before the first heartbeat.
+timeout = 60
 
 # Log to stdout for Render
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+
+def when_ready(server):
+    if preload_app:
+        from chat.backend.warmup import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    # SQLite connections and ONNX sessions are not fork-safe, so each worker builds its own.
+    from chat.backend.warmup import warm_worker
+    warm_worker()
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'chat.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -65,18 +66,42 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'web_chat_project.wsgi.application'
+ASGI_APPLICATION = 'web_chat_project.asgi.application'
 
 
 
+# Persistent connections are not reused under ASGI (each request runs in a new thread-sensitive
+# context), so they would pile up; close them after every request. Put a pooler such as PgBouncer in
+# front of Postgres if connection setup cost matters.
 DATABASES = {
     'default': dj_database_url.config(
         default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
-        conn_max_age=600
+        conn_max_age=0
     )
 }
 
 
 
+# Serves the recent-message windows of conversations (chat/conversations.py). Set REDIS_URL to share
+# them across gunicorn workers; locmem is per process, which is safe but re-reads the window from the DB.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'web-chat',
+        }
+    }
+
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',